@@ -11,11 +11,13 @@ from saucenao_api import AIOSauceNao, errors
 
 from cogs.utils.anime import AniListApi
 from cogs.utils.tracemoe import TraceMoeApi
+from cogs.utils.schedule import AiringSchedule, resolve_weekday
+from cogs.utils.seasonal import SeasonalCharts, current_season
 
-from config.utils.menu import page_source
+from config.utils.menu import page_source, LazyPageSource
 from config.utils.converters import SeasonConverter
 
-from loadconfig import __saucenao_api_key__
+from loadconfig import __saucenao_api_key__, __tracemoe_api__key__
 from config.utils.context import Context
 
 
@@ -25,9 +27,18 @@ class Anime(commands.Cog, command_attrs=dict(cooldown=commands.CooldownMapping(c
 
     def __init__(self, bot):
         self.bot = bot
-        self.ani_list_api = AniListApi()
+        self.ani_list_api = AniListApi(bot)
+        self.trace_moe_api = TraceMoeApi(bot, __tracemoe_api__key__)
+        self.airing_schedule = AiringSchedule(self.ani_list_api)
+        self.airing_schedule.start()
+        self.seasonal_charts = SeasonalCharts(self.ani_list_api)
+        self.seasonal_charts.start()
         self.message = namedtuple("message", "image_url jump_url")
 
+    async def cog_unload(self):
+        self.airing_schedule.stop()
+        self.seasonal_charts.stop()
+
     @staticmethod
     @page_source(per_page=1)
     async def sauce_source(self, menu, entry):
@@ -68,6 +79,7 @@ class Anime(commands.Cog, command_attrs=dict(cooldown=commands.CooldownMapping(c
         embed = discord.Embed(title=f"Anime schedule for {schedule_day}", color=self.default_colors())
 
         description = "\n".join(f"[{e['title']['romaji']}]({e['siteUrl']}): **Episodes** ({e['episodes'] or 'Unknown'})"
+                                f" <t:{e['nextAiringEpisode']['airingAt']}:t>"
                                 for e in entries)
 
         embed.description = description
@@ -87,6 +99,27 @@ class Anime(commands.Cog, command_attrs=dict(cooldown=commands.CooldownMapping(c
 
         return embed
 
+    @staticmethod
+    @page_source(per_page=1, parent=LazyPageSource)
+    def seasonal_source(self, menu, entry):
+        embed = discord.Embed(title=f"{entry.title} ({entry.english_title}) \nMAL ID: {entry.mal_id}",
+                              color=self.default_colors(), url=entry.url)
+
+        embed.description = f":book: **Synopsis**\n{entry.synopsis}"
+        embed.add_field(name=":tv: Episodes", value=entry.episodes)
+        embed.add_field(name=":star: Rating", value=f"{entry.score} / 100")
+        embed.add_field(name=":clapper: Type", value="ANIME")
+        embed.add_field(name=":date: Start Date", value=entry.start_date or "NaN")
+        embed.add_field(name=":date: End Date", value=entry.end_date or "NaN")
+
+        if entry.cover:
+            embed.set_thumbnail(url=entry.cover)
+
+        # the total isn't known until the last page has been fetched
+        embed.set_footer(text=f"page {menu.current_page + 1} /{self.page_count}")
+
+        return embed
+
     @staticmethod
     @page_source(per_page=1)
     def default_source(self, menu, entry):
@@ -265,67 +298,49 @@ class Anime(commands.Cog, command_attrs=dict(cooldown=commands.CooldownMapping(c
         await self.get_recommendations(ctx, js)
 
     @commands.command()
-    async def seasonal(self, ctx: Context, year: typing.Optional[int] = d.now().year, season: SeasonConverter = None):
+    async def seasonal(self, ctx: Context, year: typing.Optional[int] = None, season: SeasonConverter = None):
         """Get a list of anime for a year and season will default to the currently airing season."""
 
         if season is None:
-            month_day = d.now().month - 1
-
-            if month_day == 0:
-                month_day = 1
+            current_year, season = current_season()
+            year = year or current_year
 
-            season = await SeasonConverter().convert(ctx, str(month_day))
+        year = year or d.now().year
 
-        js = await self.ani_list_api.seasonal_search(year, season)
-        entries = js["data"]["Page"]["media"]
+        await ctx.send(f"Anime for {season.lower()} season of {year}.")
+        # pages after the first are fetched from anilist as the menu reaches them
+        source = self.seasonal_source(self.seasonal_charts.stream(year, season))
+        await source.prepare()
 
-        while js["data"]["Page"]["pageInfo"]["hasNextPage"]:
-            js = await self.ani_list_api.seasonal_search(year, season)
-            entries.extend(js)
+        if not source.entries:
+            return await ctx.send(f":no_entry: | no anime were found for {season.lower()} {year}.")
 
-        await ctx.send(f"Anime for {season.lower()} season of {year}.")
-        pages = ctx.menu(self.default_source(entries))
+        pages = ctx.menu(source)
         await pages.start(ctx)
 
-    # being worked on doesn't actually await yet
     @commands.command()
-    @commands.is_owner()
     async def schedule(self, ctx: Context, day=""):
 
-        """Get a list anime based on their schedule"""
-
-        weekdays = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-        page = 1
-        js = await self.ani_list_api.schedule_search()
-        entries = js["data"]["Page"]["media"]
-
-        while js["data"]["Page"]["pageInfo"]["hasNextPage"]:
-            page += 1
-            js = await self.ani_list_api.schedule_search(str(page))
-            entries.extend(js)
-
-        for weekday in weekdays:
-            if day.lower() in (weekday.lower()[:3], weekday.lower()[:4]):
-                day = weekday
+        """Get a list anime based on their schedule
+           pass a day like monday or mon to only get the anime airing on that day"""
 
-        for i, media in enumerate(entries):
+        weekday = None
 
-            if not isinstance(media, dict):
-                continue
+        if day:
+            weekday = resolve_weekday(day)
 
-            timestamp = media.get("nextAiringEpisode")
+            if weekday is None:
+                return await ctx.send(f"> `{day}` isn't a day of the week.")
 
-            if not timestamp:
-                continue
+        if self.airing_schedule.updated_at is None:
+            # the background refresh hasn't finished yet
+            await ctx.typing()
+            await self.airing_schedule.refresh()
 
-            timestamp = timestamp["airingAt"]
-            date = d.fromtimestamp(timestamp)
-            schedule_day = date.strftime("%A")
+        entries = self.airing_schedule.upcoming(weekday)
 
-            # filter out days
-            if day:
-                if not schedule_day.lower() != day.lower():
-                    del entries[i]
+        if not entries:
+            return await ctx.send("> no anime are airing on that day.")
 
         pages = ctx.menu(self.schedule_source(entries))
         await pages.start(ctx)
@@ -342,7 +357,7 @@ class Anime(commands.Cog, command_attrs=dict(cooldown=commands.CooldownMapping(c
         if not urls:
             return await ctx.send("> couldn't find a recent image.")
 
-        trace = TraceMoeApi(ctx)
+        trace = self.trace_moe_api
 
         if await trace.quota_reached():
             dt = d.now() + relativedelta(months=1, day=1)
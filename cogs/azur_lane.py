@@ -1,20 +1,20 @@
+import asyncio
 import re
-import copy
-import csv
-import shutil
 import typing
 
-from itertools import combinations_with_replacement
-from operator import itemgetter
-from contextlib import suppress
-from tempfile import NamedTemporaryFile
 from io import BytesIO
 
 import discord
 from discord.ext import commands
 
-from config.utils.menu import page_source
+from cogs.utils.ehp import AUXILIARY, ENEMY_HIT_SWEEP, FORMATION_BONUS, AuxiliaryPairs, ehp
+from cogs.utils.ship_index import (ShipIndex, GUIDE_NAME, GUIDE_RARITY, GUIDE_HULL, GUIDE_URL, GEAR_HUB_PATH,
+                                   SHIP_STATS_PATH, SHIP_STATS_FIELDS, write_gear_hub, write_ship_stats)
+from cogs.utils.snapshot import SnapshotWriter
+from cogs.utils.wiki import AzurLaneWiki
+from config.utils.menu import page_source, LazyPageSource
 from config.utils.context import Context
+from config.utils.tag_index import did_you_mean
 
 
 class AzurLane(commands.Cog, name="Azur Lane"):
@@ -22,18 +22,18 @@ class AzurLane(commands.Cog, name="Azur Lane"):
 
     def __init__(self, bot):
 
-        # thanks to @cyberFluff#9161
-        with open(r"config/Gear Guide Hub.csv", "r") as file:
-            ship_gear_hub = list(csv.reader(file))
-
-        with open(r"config/ShipStats120.csv", "r") as file:
-            reader = csv.DictReader(file, fieldnames=("# Lvl 120", "Name", "Hull", "HP", "EVA", "LUK", "Armor",
-                                                      "EVA Rate", "EVAS", "DMGR"))
-            reader = list(reader)
-
-        self.ship_stats_reader = reader
-        self.ship_gear_hub = ship_gear_hub
+        # updated along with its rows by the add and delete commands
+        self.ships = ShipIndex.load()
+        # edits are written a few seconds later off the loop, several edits in a row are a single write
+        self.gear_hub_writer = SnapshotWriter(GEAR_HUB_PATH, lambda: [list(row) for row in self.ships.gear_hub],
+                                              write_gear_hub)
+        self.ship_stats_writer = SnapshotWriter(SHIP_STATS_PATH, lambda: [dict(row) for row in self.ships.stats_rows],
+                                                write_ship_stats)
+        # held by the edit commands and reload so an edit can't go into an index that's about to be replaced
+        self.ships_lock = asyncio.Lock()
+        self.aux_pairs = AuxiliaryPairs()
         self.bot = bot
+        self.wiki = AzurLaneWiki(bot)
 
         #    self.auxiliary_list = [["Repair Tool", 500],
         #                                ["Fire Suppressor", 226],
@@ -44,13 +44,7 @@ class AzurLane(commands.Cog, name="Azur Lane"):
         #                                ["Beaver Badge", 75, 35],
         #                                ["Improved Hydraulic Rudder", 60, 40]]
 
-        self.auxiliary_list = [["Repair Tool", 500],
-                               ["Fire Suppressor", 226],
-                               ["Navy Camouflage", 44, 17],
-                               ["Fuel Filter", 350, 5],
-                               ["SG Radar", 0, 15],
-                               ["Beaver Badge", 75, 35],
-                               ["Improved Hydraulic Rudder", 60, 40]]
+        self.auxiliary_list = AUXILIARY
 
     @staticmethod
     @page_source(per_page=11)
@@ -64,45 +58,39 @@ class AzurLane(commands.Cog, name="Azur Lane"):
         return entries
 
     @staticmethod
-    def __return_based_on_length(aux_slot):
-        if len(aux_slot) == 3:
-            return aux_slot[1], aux_slot[2]
-
-        return aux_slot[1]
+    @page_source(per_page=20)
+    async def ehp_source(self, menu, entries):
+        return "\n".join(entries)
 
     @staticmethod
-    def delete_from_reader(ship_name, list_of_rows, update_function):
-        for i, row in enumerate(list_of_rows):
-            if isinstance(row, dict):
+    @page_source(per_page=1, parent=LazyPageSource)
+    async def image_source(self, menu, image):
+        embed = discord.Embed(color=self.default_colors(), description=f"[{image['title']}]({image['url']})")
 
-                if row["Name"].lower() == ship_name.lower():
-                    del list_of_rows[i]
-                    update_function()
-                    return True
+        if self.png:
+            embed.set_image(url=image["url"])
 
-            else:
+        return embed
 
-                if row[0].lower() == ship_name.lower():
-                    del list_of_rows[i]
-                    update_function()
-                    return True
+    async def cog_unload(self):
+        await self.gear_hub_writer.close()
+        await self.ship_stats_writer.close()
 
-        return False
+    @property
+    def ship_stats(self):
+        # numeric columns of the stats rows for the ehp commands
+        return self.ships.ship_stats
 
     def check_ship_name(self, ship_name):
+        return self.ships.canonical_name(ship_name)
 
-        for row in self.ship_gear_hub:
-            if row[0].lower() == ship_name.lower():
-                ship_name = row[0].replace("kai", "Kai")
-
-        return ship_name
+    def did_you_mean(self, ship_name):
+        return did_you_mean(self.ships.suggestions(ship_name))
 
     async def find_image_names(self, ctx: Context, word, ship=True):
 
         params = {
             "aisort": "name",
-            "action": "query",
-            "format": "json",
             "aiprop": "size",
             "list": "allimages",
             "aimime": "image/png",
@@ -110,7 +98,7 @@ class AzurLane(commands.Cog, name="Azur Lane"):
             "ailimit": 60
         }
 
-        results = await self.bot.fetch("https://azurlane.koumakan.jp/w/api.php", params=params)
+        results = await self.wiki.query(params, "images")
 
         names = [result["name"] for result in results["query"]["allimages"]
                  if word.lower() in result["name"].lower() or
@@ -130,12 +118,7 @@ class AzurLane(commands.Cog, name="Azur Lane"):
 
     async def azur_lane_wiki_search(self, ctx, item, allow_none_png=False, paginate=True):
 
-        params = {
-            "aisort": "name",
-            "action": "query",
-            "format": "json",
-            "list": "allimages"
-        }
+        params = {}
 
         if "kai" in item.lower():
             item = item[::-1].replace(" ", "", 1)[::-1]
@@ -149,128 +132,31 @@ class AzurLane(commands.Cog, name="Azur Lane"):
                 item = f"{item}.png"
 
         params["aiprefix"] = item.replace("_", " ")
-        js = await ctx.bot.fetch("https://azurlane.koumakan.jp/w/api.php", params=params)
-        entries = []
-        for js in js["query"]["allimages"]:
-
-            if paginate:
 
-                if item in js["title"]:
-                    embed = discord.Embed(color=ctx.bot.default_colors(), description=f"[{js['title']}]({js['url']})")
+        if not paginate:
+            image = await self.wiki.first_image(**params)
+            return image["url"] if image else "https://i.imgur.com/la4e2G4.jpg"
 
-                    if allow_none_png is False:
-                        embed.set_image(url=js["url"])
+        async def images():
+            async for image in self.wiki.images(limit=50, **params):
+                if item in image["title"]:
+                    yield image
 
-                    entries.append(embed)
-            else:
-                return js["url"]
+        # results past the first batch are only requested as the pages are viewed
+        source = self.image_source(images(), png=allow_none_png is False)
+        await source.prepare()
 
-        if entries == [] and paginate:
+        if not source.entries:
             return await ctx.send(f":no_entry: | search failed for {item}")
 
-        if not paginate:
-            return "https://i.imgur.com/la4e2G4.jpg"
-
-        pages = ctx.global_menu(ctx.list_source(entries))
+        pages = ctx.global_menu(source)
         await pages.start(ctx)
 
-    def auxiliary_slots(self, option=0):
-        auxiliary_slot_hp = 0
-        auxiliary_slot_evasion = 0
-
-        if option in (1, 2):
-            auxiliary_slot_hp = self.auxiliary_list[option - 1][1]
-
-        elif option in (3, 4, 7, 5):
-            auxiliary_slot_hp = self.auxiliary_list[option - 1][1]
-            auxiliary_slot_evasion = self.auxiliary_list[option - 1][2]
-
-        return auxiliary_slot_hp, auxiliary_slot_evasion
-
-    def return_ship_dict(self, ship_name):
-        for row in self.ship_stats_reader:
-            if row.get("Name", "null").lower() == ship_name:
-                ship_dict = row
-
-                for key, value in ship_dict.items():
-                    with suppress(AttributeError, ValueError):
-                        ship_dict[key] = float(value)
-
-                return ship_dict
-
-        return None
-
-    def find_best_ehp(self, enemy_hit, ship_dict, aux_list_combinations):
-
-        aux_slot_eva = 0
-        aux_slot_eva_two = 0
-        results = []
-
-        for tup_list in aux_list_combinations:
-            aux_slot, aux_slot_two = tup_list
-            display_aux, display_aux_two = aux_slot[0], aux_slot_two[0]
-            result = self.__return_based_on_length(aux_slot)
-            result_two = self.__return_based_on_length(aux_slot_two)
-            if not isinstance(result, int):
-                aux_slot_hp, aux_slot_eva = result
-            else:
-                aux_slot_hp = result
-
-            if not isinstance(result_two, int):
-                aux_slot_hp_two, aux_slot_eva_two = result_two
-
-            else:
-                aux_slot_hp_two = result_two
-            # to not allow two IHR result shouldn't change if it's slotted with a beaver badge
-            if (aux_slot_hp, aux_slot_eva) == (aux_slot_hp_two, aux_slot_eva_two) == (60, 40):
-                display_aux = "Beaver Badge"
-                aux_slot_hp, aux_slot_eva = self.auxiliary_list[6][1], self.auxiliary_list[6][2]
-
-            ship_evasion = ship_dict["EVA"] * (1 + ship_dict["EVAS"]) + aux_slot_eva + aux_slot_eva_two
-            ship_hp = ship_dict["HP"] + aux_slot_hp + aux_slot_hp_two
-            ship_luck = ship_dict["LUK"]
-
-            ship_evasion_rate = ship_dict["EVA Rate"]
-
-            accuracy = 0.1 + enemy_hit / (enemy_hit + ship_evasion + 2) + (
-                    (0 - ship_luck) * 0.001
-            ) - ship_evasion_rate
-
-            if accuracy < 0.1:
-                accuracy = 0.1
-
-            elif accuracy > 1:
-                accuracy = 1
-
-            ehp = ship_hp / (accuracy * (1 - ship_dict["DMGR"]))
-            ehp = round(ehp, 2)
-            results.append([ehp, (display_aux, display_aux_two)])
-        # getting the index and max value
-        result = max(enumerate(map(itemgetter(0), results)), key=itemgetter(1))
-        return results[result[0]][1], result[1]
-
     def update_ship_gear_hub(self):
-        temp = NamedTemporaryFile(mode="w", delete=False)
-        filename = "config/Gear Guide Hub.csv"
-
-        with open(r"config/Gear Guide Hub.csv", "r") as file, temp:
-            csv_writer = csv.writer(temp, delimiter=",", lineterminator="\n")
-            csv_writer.writerows(self.ship_gear_hub)
-
-        shutil.move(temp.name, filename)
+        self.gear_hub_writer.schedule()
 
     def update_ship_stats_csv(self):
-        temp = NamedTemporaryFile(mode="w", delete=False)
-        filename = "config/ShipStats120.csv"
-        fields = ["# Lvl 120", "Name", "Hull", "HP", "EVA", "LUK", "Armor", "EVA Rate", "EVAS", "DMGR"]
-
-        with open(r"config/ShipStats120.csv", "r") as file, temp:
-            writer = csv.DictWriter(temp, fieldnames=fields, lineterminator="\n")
-
-            for row in self.ship_stats_reader:
-                writer.writerow(row)
-
-        shutil.move(temp.name, filename)
+        self.ship_stats_writer.schedule()
 
     async def make_gear_guide_embed(self, ctx: Context, ship_name, url):
         # since im lazy this only temp
@@ -284,14 +170,12 @@ class AzurLane(commands.Cog, name="Azur Lane"):
 
     async def get_hull_or_rarity(self, ctx: Context, index, item):
         entries = []
-        col_name = self.ship_gear_hub[0][index]
+        col_name = self.ships.header[index]
+        rows = self.ships.by_hull(item) if index == GUIDE_HULL else self.ships.by_rarity(item)
 
-        for row in self.ship_gear_hub:
-            if row[index].lower() == item.lower():
-                ship_name = row[0]
-                url = row[3]
-                embed = await self.make_gear_guide_embed(ctx, ship_name, url)
-                entries.append(embed)
+        for row in rows:
+            embed = await self.make_gear_guide_embed(ctx, row[GUIDE_NAME], row[GUIDE_URL])
+            entries.append(embed)
 
         if not entries:
             return await ctx.send(f"> invalid {col_name} was entered.")
@@ -348,11 +232,10 @@ class AzurLane(commands.Cog, name="Azur Lane"):
             return content, display_aux_
 
         messages_to_delete = []
-        ship_name = ship_name.lower()
-        ship_dict = self.return_ship_dict(ship_name)
+        ship = self.ships.stats_position(ship_name)
 
-        if ship_dict is None:
-            return await ctx.send(f"> the ship {ship_name} was not found.")
+        if ship is None:
+            return await ctx.send(f"> the ship {ship_name} was not found." + self.did_you_mean(ship_name))
 
         msg = await ctx.send(":ship: :ship: :ship:  | Type in the formation, Single, Diamond or Double.")
         messages_to_delete.append(msg.id)
@@ -367,7 +250,6 @@ class AzurLane(commands.Cog, name="Azur Lane"):
         if msg not in ("single", "diamond", "double"):
             await ctx.send(f":no_entry: |  invalid formation {msg} was passed defaulting to diamond.")
 
-        formation_bonus = {"single": -0.1, "double": 0.3}.get(msg, 0)
         form_display = msg
 
         level_difference = enemy_level - 120
@@ -378,7 +260,7 @@ class AzurLane(commands.Cog, name="Azur Lane"):
         elif level_difference > 20:
             level_difference = 20
 
-        hull = ship_dict["Hull"]
+        hull = self.ship_stats.hulls[ship]
 
         embed = discord.Embed(title=f"EHP Calculator",
                               description=f"Select an option for aux slot by typing it's number"
@@ -410,34 +292,25 @@ class AzurLane(commands.Cog, name="Azur Lane"):
         except TypeError:
             return
 
-        aux_slot_hp, aux_slot_eva = self.auxiliary_slots(index)
-        aux_slot_hp_two, aux_slot_eva_two = self.auxiliary_slots(index_two)
-
-        ship_evasion = ship_dict["EVA"] * (1 + ship_dict["EVAS"] + formation_bonus) + aux_slot_eva + aux_slot_eva_two
-        ship_hp = ship_dict["HP"] + aux_slot_hp + aux_slot_hp_two
-        ship_luck = ship_dict["LUK"]
-
-        ship_evasion_rate = ship_dict["EVA Rate"]
+        aux_slot_hp, aux_slot_eva = self.aux_pairs.slot(index)
+        aux_slot_hp_two, aux_slot_eva_two = self.aux_pairs.slot(index_two)
 
         ship_details = "Enemy luck set to 0 as a constant \nIn auxiliary slot one is {}, in auxiliary slot two is {}"
         ship_details = ship_details.format(display_aux, display_aux_two)
 
-        enemy_luck = 0
+        stats = self.ship_stats
+        ship_evasion = stats.evasion[ship] * (1 + stats.evasion_stat[ship] + FORMATION_BONUS.get(msg, 0))
 
         ship_name = ship_name.capitalize()
-        accuracy = 0.1 + enemy_hit / (enemy_hit + ship_evasion + 2) + (
-                (enemy_luck - ship_luck + level_difference) * 0.001
-        ) - ship_evasion_rate
-
-        if accuracy < 0.1:
-            accuracy = 0.1
-
-        elif accuracy > 1:
-            accuracy = 1
-
-        ehp = ship_hp / (accuracy * (1 - ship_dict["DMGR"]))
-        ehp = round(ehp, 2)
-        ship_details += f"\n{ship_name}\'s EHP at enemy hit **{enemy_hit}** is **{ehp}**"
+        value = ehp(stats.hp[ship] + aux_slot_hp + aux_slot_hp_two,
+                    ship_evasion + aux_slot_eva + aux_slot_eva_two,
+                    stats.luck[ship],
+                    stats.evasion_rate[ship],
+                    stats.damage_reduction[ship],
+                    enemy_hit,
+                    level_difference)
+
+        ship_details += f"\n{ship_name}\'s EHP at enemy hit **{enemy_hit}** is **{value:.2f}**"
         embed.timestamp = ctx.message.created_at
 
         await ctx.send(f"> {ship_name}\'s EHP with {ship_details} with formation {form_display}")
@@ -452,20 +325,52 @@ class AzurLane(commands.Cog, name="Azur Lane"):
     @ehp.command()
     async def default(self, ctx: Context, enemy_hit: typing.Optional[int] = 45, *, ship_name):
         """Attempts to find the best ehp with default aux slots set and formation set to diamond"""
-        # it just works.tm function and goes beyond
+        ship = self.ships.stats_position(ship_name)
 
-        aux_list = copy.deepcopy(self.auxiliary_list)
-        ship_name = ship_name.lower()
-        ship_dict = self.return_ship_dict(ship_name)
+        if ship is None:
+            return await ctx.send(f"> the ship {ship_name} was not found." + self.did_you_mean(ship_name))
 
-        if ship_dict is None:
-            return await ctx.send(f"> the ship {ship_name} was not found.")
-
-        combinations = combinations_with_replacement(aux_list, 2)
-        result = self.find_best_ehp(enemy_hit, ship_dict, combinations)
-        aux_string, aux_string_two = result[0]
+        # every aux pair in one pass
+        values, best = self.ship_stats.best([ship], enemy_hit, self.aux_pairs)
+        aux_string, aux_string_two = self.aux_pairs.pair(best[0])
         aux_slots = "aux slot one being **{}** and aux slot two **{}**".format(aux_string, aux_string_two)
-        await ctx.send(f"> {ship_name}\'s EHP with {aux_slots} and enemy hit {enemy_hit} is **{result[1]}**")
+        await ctx.send(f"> {ship_name.lower()}\'s EHP with {aux_slots} and enemy hit {enemy_hit} is "
+                       f"**{values[0]:.2f}**")
+
+    @ehp.command(name="hull")
+    async def ehp_hull(self, ctx: Context, enemy_hit: typing.Optional[int] = 45, *, hull):
+        """Rank every ship of a hull type like DD or BB by its best ehp with formation set to diamond"""
+
+        ships, values, best = self.ship_stats.rank_hull(hull, enemy_hit, self.aux_pairs)
+
+        if not len(ships):
+            return await ctx.send(f"> no ships with the hull {hull} were found.")
+
+        entries = [f"{rank}. **{self.ship_stats.names[ship]}** {value:.2f} "
+                   f"({' / '.join(self.aux_pairs.pair(pair))})"
+                   for rank, (ship, value, pair) in enumerate(zip(ships, values, best), 1)]
+
+        await ctx.send(f"> Best EHP of every {hull.upper()} at enemy hit {enemy_hit}")
+        pages = ctx.menu(self.ehp_source(entries))
+        await pages.start(ctx)
+
+    @ehp.command(name="sweep")
+    async def ehp_sweep(self, ctx: Context, *, ship_name):
+        """The best ehp and aux slots of a ship for every enemy hit from 1 to 200"""
+
+        ship = self.ships.stats_position(ship_name)
+
+        if ship is None:
+            return await ctx.send(f"> the ship {ship_name} was not found." + self.did_you_mean(ship_name))
+
+        hits = ENEMY_HIT_SWEEP
+        values, best = self.ship_stats.sweep(ship, self.aux_pairs, hits)
+        entries = [f"enemy hit **{hit}**: {value:.2f} ({' / '.join(self.aux_pairs.pair(pair))})"
+                   for hit, value, pair in zip(hits, values[:, 0], best[:, 0])]
+
+        await ctx.send(f"> Best EHP of {self.ship_stats.names[ship]} from enemy hit {hits[0]} to {hits[-1]}")
+        pages = ctx.menu(self.ehp_source(entries))
+        await pages.start(ctx)
 
     @commands.command(aliases=["sd"])
     async def ship_details(self, ctx, filtered: typing.Optional[bool] = False, *, ship_name):
@@ -473,20 +378,12 @@ class AzurLane(commands.Cog, name="Azur Lane"):
 
         ship_name = self.check_ship_name(ship_name)
 
-        params = {'action': 'query',
-                  'titles': ship_name,
-                  'prop': 'revisions|categories',
-                  'rvprop': 'content',
-                  'format': 'json',
-                  'formatversion': '2',
-                  'rvslots': 'main'}
+        page = await self.wiki.page(ship_name)
 
-        results = await self.bot.fetch("https://azurlane.koumakan.jp/w/api.php", params=params)
-
-        if all("Category:Ships" not in x["title"] for x in results["query"]["pages"][0]["categories"]):
+        if all("Category:Ships" not in x["title"] for x in page["categories"]):
             return await ctx.send(f"The ship `{ship_name}` could not be found.")
 
-        result = results["query"]["pages"][0]["revisions"][0]["slots"]["main"]["content"]
+        result = page["revisions"][0]["slots"]["main"]["content"]
         ship_dets = ""
 
         replace_dict = {"Skin": f"{ship_name}\'s skin ",
@@ -553,8 +450,7 @@ class AzurLane(commands.Cog, name="Azur Lane"):
         """
         count = 1
 
-        params = {"search": search}
-        results = await self.bot.fetch("https://azurlane.koumakan.jp/w/api.php?action=opensearch", params=params)
+        results = await self.wiki.opensearch(search)
         entries = []
         for result in results:
 
@@ -589,20 +485,19 @@ class AzurLane(commands.Cog, name="Azur Lane"):
         if "kai" in ship_name.lower():
             ship_name = ship_name[::-1].replace(" ", "", 1)[::-1]
 
-        for row in self.ship_gear_hub:
-            if row[0].lower() == ship_name.lower():
-                ship_name = row[0]
-                url = row[3]
-                embed = await self.make_gear_guide_embed(ctx, ship_name, url)
-                return await ctx.send(embed=embed)
+        row = self.ships.guide(ship_name)
+
+        if row is None:
+            return await ctx.send(f"> couldn't find a guide for {ship_name}" + self.did_you_mean(ship_name))
 
-        return await ctx.send(f"> couldn't find a guide for {ship_name}")
+        embed = await self.make_gear_guide_embed(ctx, row[GUIDE_NAME], row[GUIDE_URL])
+        await ctx.send(embed=embed)
 
     @gear_guide.command()
     async def hull(self, ctx: Context, *, hull):
         """Get a list of gear guides based on hull type."""
         await ctx.typing()
-        await self.get_hull_or_rarity(ctx, 2, hull)
+        await self.get_hull_or_rarity(ctx, GUIDE_HULL, hull)
 
     @gear_guide.command()
     async def rarity(self, ctx: Context, *, rarity):
@@ -613,7 +508,7 @@ class AzurLane(commands.Cog, name="Azur Lane"):
         if rarity.lower() == "super rare":
             rarity = "ssr"
 
-        await self.get_hull_or_rarity(ctx, 1, rarity)
+        await self.get_hull_or_rarity(ctx, GUIDE_RARITY, rarity)
 
     @commands.is_owner()
     @gear_guide.command(name="add")
@@ -621,24 +516,26 @@ class AzurLane(commands.Cog, name="Azur Lane"):
         """Add a new ship to the gear guide hub"""
         new_row = [ship_name, rarity, hull, url]
 
-        for row in self.ship_gear_hub:
-            if row[0].lower() == ship_name.lower():
+        async with self.ships_lock:
+            if self.ships.guide(ship_name) is not None:
                 return await ctx.send("> ship already exists.")
 
-        self.ship_gear_hub.append(new_row)
-        self.update_ship_gear_hub()
+            self.ships.add_guide(new_row)
+            self.update_ship_gear_hub()
+
         await ctx.send("> successfully updated.")
-        self.bot.reload_extension("cogs.azur_lane")
 
     @commands.is_owner()
     @gear_guide.command(name="delete")
     async def delete_ship_from_ggh(self, ctx: Context, *, ship_name):
         """Remove a ship from the gear guide hub."""
-        if not self.delete_from_reader(ship_name, self.ship_gear_hub, self.update_ship_gear_hub):
-            return await ctx.send(f":no_entry: | {ship_name} doesn't exist")
+        async with self.ships_lock:
+            if self.ships.remove_guide(ship_name) is None:
+                return await ctx.send(f":no_entry: | {ship_name} doesn't exist")
+
+            self.update_ship_gear_hub()
 
         await ctx.send("> successfully updated.")
-        self.bot.reload_extension("cogs.azur_lane")
 
     @commands.is_owner()
     @commands.group(name="uss", invoke_without_command=True)
@@ -650,31 +547,47 @@ class AzurLane(commands.Cog, name="Azur Lane"):
     async def add_ship_to_ss_csv(self, ctx: Context, *fields):
         """Add a ship to the ship stats csv"""
 
-        keys = ["# Lvl 120", "Name", "Hull", "HP", "EVA", "LUK", "Armor", "EVA Rate", "EVAS", "DMGR"]
+        keys = SHIP_STATS_FIELDS
 
         if len(fields) != len(keys):
             return await ctx.send(":no_entry: | not enough keys entered")
 
-        for row in self.ship_stats_reader:
-            if row["Name"].lower() == fields[1].lower():
+        async with self.ships_lock:
+            if self.ships.stats_row(fields[1]) is not None:
                 return await ctx.send("> Ship already exists.")
 
-        row = dict(zip(keys, fields))
+            self.ships.add_stats(dict(zip(keys, fields)))
+            self.update_ship_stats_csv()
 
-        self.ship_stats_reader.append(row)
-        self.update_ship_stats_csv()
         await ctx.send("> successfully updated.")
-        self.bot.reload_extension("cogs.azur_lane")
 
     @commands.is_owner()
     @update_ship_stats.command(name="delete")
     async def delete_ship_from_ss_csv(self, ctx: Context, *, ship_name):
         """Remove a ship from the ship stats csv"""
-        if not self.delete_from_reader(ship_name, self.ship_stats_reader, self.update_ship_stats_csv):
-            return await ctx.send(f":no_entry: | {ship_name} doesn't exist")
+        async with self.ships_lock:
+            if self.ships.remove_stats(ship_name) is None:
+                return await ctx.send(f":no_entry: | {ship_name} doesn't exist")
+
+            self.update_ship_stats_csv()
 
         await ctx.send("> successfully updated.")
-        self.bot.reload_extension("cogs.azur_lane")
+
+    @commands.is_owner()
+    @update_ship_stats.command(name="reload")
+    async def reload_ship_data(self, ctx: Context):
+        """Reload the gear guide hub and ship stats csv files without reloading the cog"""
+
+        # edits wait for the reload, one made while the files are read would be dropped by the swap
+        async with self.ships_lock:
+            # edits that haven't been written yet would otherwise be lost
+            await self.gear_hub_writer.flush()
+            await self.ship_stats_writer.flush()
+
+            ships = await self.bot.loop.run_in_executor(None, ShipIndex.load)
+            self.ships = ships
+
+        await ctx.send(f"> reloaded {len(ships.guides)} gear guides and {len(ships.stats)} ship stats.")
 
     @commands.command(aliases=["fsi"])
     async def find_ship_image(self, ctx: Context, *, word):
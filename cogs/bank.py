@@ -65,10 +65,25 @@ class Bank(commands.Cog):
             confirmation = await ctx.wait_for_input(transaction_id, cancel_message)
 
             if confirmation:
-                await ctx.db.execute("UPDATE users SET credits = credits + $1 WHERE user_id = $2", amount, member.id)
+                # the balance may have changed while waiting on the pin, check it again with the rows locked
+                async with ctx.transaction() as con:
+                    # locked in user_id order so two transfers between the same users can't deadlock
+                    rows = await con.fetch("""SELECT user_id, credits FROM users WHERE user_id = ANY($1::bigint[])
+                                              ORDER BY user_id FOR UPDATE""", [ctx.author.id, member.id])
 
-                await ctx.db.execute("UPDATE users SET credits = credits - $1 WHERE user_id = $2",
-                                     amount * 1.05, ctx.author.id)
+                    balances = {row["user_id"]: row["credits"] for row in rows}
+                    current_balance = balances.get(ctx.author.id)
+                    enough = current_balance is not None and current_balance - amount * 1.05 >= 0
+
+                    if enough:
+                        await con.execute("UPDATE users SET credits = credits + $1 WHERE user_id = $2",
+                                          amount, member.id)
+
+                        await con.execute("UPDATE users SET credits = credits - $1 WHERE user_id = $2",
+                                          amount * 1.05, ctx.author.id)
+
+                if not enough:
+                    return await ctx.send(":no_entry: | you no longer have enough credits for this transaction.")
 
                 await ctx.send(
                     f":information_source: | {member.display_name}, {amount} has been transferred to your account by "
@@ -1,4 +1,8 @@
-from discord.ext import commands
+import asyncio
+
+import asyncpg
+import discord
+from discord.ext import commands, tasks
 
 
 class Database(commands.Cog):
@@ -6,37 +10,172 @@ class Database(commands.Cog):
     def __init__(self, bot):
 
         self.bot = bot
+        # bounds how many guilds are synced at once so startup doesn't take the whole pool
+        self.sync_semaphore = asyncio.Semaphore(4)
+        # (user_id, guild_id) -> name, members waiting to be inserted by flush_pending
+        self.pending_members = {}
+        # held while a batch is swapped out and written so cog_unload can't cancel a flush half way
+        self.flush_lock = asyncio.Lock()
+        # user_id -> name, repeated renames of a user only keep the latest
+        self.pending_renames = {}
+        self.flush_pending.add_exception_type(asyncpg.PostgresError, asyncpg.InterfaceError)
+        self.flush_pending.start()
+
+    async def cog_unload(self):
+        # a batch the loop is already writing is waited on, the loop is only cancelled between batches
+        async with self.flush_lock:
+            self.flush_pending.cancel()
+
+        await self.insert_pending_members()
+        await self.update_pending_renames()
+
+    @staticmethod
+    def utcnow():
+        return discord.utils.utcnow().replace(tzinfo=None)
+
+    @staticmethod
+    async def insert_members(con, records):
+        """Insert the rows missing for (user_id, guild_id, name) records, must be called in a transaction"""
+
+        # dropped at the end of the transaction so pooled connections don't keep it around
+        await con.execute("""CREATE TEMPORARY TABLE member_sync (user_id bigint, guild_id bigint, name text,
+                                                                 PRIMARY KEY (user_id, guild_id))
+                             ON COMMIT DROP;""")
+
+        await con.copy_records_to_table("member_sync", records=records, columns=("user_id", "guild_id", "name"))
+
+        await con.execute("""INSERT INTO guilds (guild_id, allow_default, replace_twitter_links)
+                             SELECT DISTINCT s.guild_id, true, false FROM member_sync s
+                             ON CONFLICT DO NOTHING;""")
+
+        # ordered so syncs running at the same time take row locks in the same order
+        await con.execute("""INSERT INTO users (user_id, name, credits)
+                             SELECT DISTINCT ON (s.user_id) s.user_id, s.name, 3000 FROM member_sync s
+                             WHERE NOT EXISTS (SELECT 1 FROM users u WHERE u.user_id = s.user_id)
+                             ORDER BY s.user_id
+                             ON CONFLICT DO NOTHING;""")
+
+        await con.execute("""INSERT INTO fish_users (user_id)
+                             SELECT DISTINCT s.user_id FROM member_sync s
+                             WHERE NOT EXISTS (SELECT 1 FROM fish_users f WHERE f.user_id = s.user_id)
+                             ORDER BY s.user_id
+                             ON CONFLICT DO NOTHING;""")
+
+        await con.execute("""INSERT INTO user_tag_usage (user_id, guild_id)
+                             SELECT s.user_id, s.guild_id FROM member_sync s
+                             WHERE NOT EXISTS (SELECT 1 FROM user_tag_usage t
+                                               WHERE t.user_id = s.user_id AND t.guild_id = s.guild_id)
+                             ORDER BY s.user_id, s.guild_id
+                             ON CONFLICT DO NOTHING;""")
 
     async def batch_insert(self, guild):
-        async with self.bot.pool.acquire() as con:
+        """Full sync of a guild's members, only needed for guilds that have never been synced"""
+
+        synced_at = self.utcnow()
+        records = [(m.id, guild.id, m.name) for m in guild.members if not m.bot]
+
+        async with self.sync_semaphore, self.bot.pool.acquire() as con:
+            async with con.transaction():
+                await con.execute("""INSERT INTO guilds (guild_id, allow_default, replace_twitter_links)
+                                     VALUES ($1,$2,$3) ON CONFLICT DO NOTHING;""", guild.id, True, False)
+
+                await self.insert_members(con, records)
+
+                await con.execute("UPDATE guilds SET synced_at = $1 WHERE guild_id = $2", synced_at, guild.id)
+
+    def queue_member(self, member):
+        self.pending_members[(member.id, member.guild.id)] = member.name
+
+    async def insert_pending_members(self):
+        async with self.flush_lock:
+            if not self.pending_members:
+                return
+
+            # taken before the swap so the watermark only covers members in this batch, ones that join during the
+            # write are still pending and a restart has to see them as after it
+            flushed_at = self.utcnow()
+            # swapped out first so members queued during the write go in the next batch
+            pending, self.pending_members = self.pending_members, {}
+            records = [(user_id, guild_id, name) for (user_id, guild_id), name in pending.items()]
+            guild_ids = list({guild_id for _, guild_id in pending})
+
+            try:
+                async with self.bot.pool.acquire() as con:
+                    async with con.transaction():
+                        await self.insert_members(con, records)
+                        # every join up to now is in, so a reconnect only has to look at members after this
+                        await con.execute("""UPDATE guilds SET synced_at = $1
+                                             WHERE guild_id = ANY($2::bigint[]) AND synced_at IS NOT NULL""",
+                                          flushed_at, guild_ids)
+
+            except Exception:
+                for key, name in pending.items():
+                    self.pending_members.setdefault(key, name)
+                raise
+
+    async def update_pending_renames(self):
+        async with self.flush_lock:
+            if not self.pending_renames:
+                return
+
+            pending, self.pending_renames = self.pending_renames, {}
+
+            try:
+                await self.bot.pool.execute("""UPDATE users u SET name = d.name
+                                               FROM unnest($1::bigint[], $2::text[]) AS d (user_id, name)
+                                               WHERE u.user_id = d.user_id AND u.name IS DISTINCT FROM d.name""",
+                                            list(pending.keys()), list(pending.values()))
+
+            except Exception:
+                for user_id, name in pending.items():
+                    self.pending_renames.setdefault(user_id, name)
+                raise
+
+    @tasks.loop(seconds=5)
+    async def flush_pending(self):
+        # members first so a member that joined and renamed in the same batch gets their new name
+        await self.insert_pending_members()
+        await self.update_pending_renames()
+
+    @flush_pending.before_loop
+    async def before_flush_pending(self):
+        await self.bot.wait_until_ready()
 
-            user_tups = [(m.id, m.name, 3000) for m in guild.members if not m.bot]
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # on_ready fires again after a reconnect, guilds that were synced before only
+        # need the members that joined after their watermark
+        ready_at = self.utcnow()
+        rows = await self.bot.pool.fetch("SELECT guild_id, synced_at FROM guilds")
+        watermarks = {row["guild_id"]: row["synced_at"] for row in rows}
 
-            member_ids = list((data[0],) for data in user_tups)
+        never_synced = [g for g in self.bot.guilds if watermarks.get(g.id) is None]
+        synced = [g for g in self.bot.guilds if watermarks.get(g.id) is not None]
 
-            await con.execute("""INSERT INTO guilds (guild_id, allow_default, replace_twitter_links) VALUES ($1,$2,$3)
-                                 ON CONFLICT DO NOTHING;""", guild.id, True, False)
+        await asyncio.gather(*(self.batch_insert(g) for g in never_synced))
 
-            await con.executemany("""INSERT INTO users (user_id, name, credits) 
-                                     VALUES ($1,$2,$3) ON CONFLICT DO NOTHING;""", user_tups)
+        for guild in synced:
+            since = watermarks[guild.id]
+            for member in guild.members:
+                if member.bot:
+                    continue
 
-            await con.executemany("""INSERT INTO fish_users (user_id)         
-                                     VALUES ($1) ON CONFLICT DO NOTHING;""", member_ids)
+                if member.joined_at is None or member.joined_at.replace(tzinfo=None) > since:
+                    self.queue_member(member)
 
-            await con.executemany("""INSERT INTO user_tag_usage (user_id, guild_id)
-                                     VALUES ($1, $2) ON CONFLICT DO NOTHING;""", ((m[0], guild.id) for m in member_ids))
+        await self.insert_pending_members()
 
-    @commands.Cog.listener()
-    async def on_ready(self):
-        for g in self.bot.guilds:
-            await self.batch_insert(g)
+        if synced:
+            await self.bot.pool.execute("UPDATE guilds SET synced_at = $1 WHERE guild_id = ANY($2::bigint[])",
+                                        ready_at, [g.id for g in synced])
 
     @commands.Cog.listener()
-    async def on_user_update(self, _, after):
-        new_name = after.name
-        user_id = after.id
-        async with self.bot.pool.acquire() as con:
-            await con.execute("UPDATE users SET name = $1 where user_id = $2", new_name, user_id)
+    async def on_user_update(self, before, after):
+        # fires for avatar and other changes too, only renames need a write
+        if before.name == after.name:
+            return
+
+        self.pending_renames[after.id] = after.name
 
     @commands.Cog.listener()
     async def on_guild_join(self, guild):
@@ -47,12 +186,8 @@ class Database(commands.Cog):
         if member.bot:
             return
 
-        async with self.bot.pool.acquire() as con:
-            await con.execute("INSERT INTO users (user_id, name, credits) VALUES ($1,$2,$3) ON CONFLICT DO NOTHING;",
-                              member.id, member.name, 3000)
-            await con.execute("INSERT INTO fish_users (user_id) VALUES ($1) ON CONFLICT DO NOTHING;", member.id)
-            await con.execute("INSERT INTO user_tag_usage (user_id, guild_id) VALUES ($1, $2) ON CONFLICT DO NOTHING;",
-                              member.id, member.guild.id)
+        # inserted with the next batch by flush_pending
+        self.queue_member(member)
 
 
 async def setup(bot):
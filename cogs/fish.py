@@ -1,7 +1,8 @@
-import re
 import asyncio
 import typing
 
+from io import BytesIO
+
 import discord
 from discord.ext import commands
 
@@ -11,6 +12,8 @@ from config.utils.context import Context
 
 from cogs.utils.views import InventoryView, FishBuyView, FishSellView
 from cogs.utils.fish import Fishing as Fish
+from cogs.utils.fish_sync import FishSync
+from cogs.utils.wiki import AzurLaneWiki
 
 from loadconfig import FISH_GUILDS
 
@@ -20,6 +23,7 @@ class Fishing(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
+        self.wiki = AzurLaneWiki(bot)
 
     def embed(self, fish):
         fish = "\n".join(fish)
@@ -41,147 +45,6 @@ class Fishing(commands.Cog):
                                   f"`{ctx.command.name}`",
                                   delete_after=10)
 
-    async def get_pages_revisions(self, ctx, chunk, url):
-
-        titles = "|".join(js["title"] for js in chunk)
-
-        page_params = {
-            "action": "query",
-            "prop": "revisions",
-            "titles": titles,
-            "rvprop": "content",
-            "rvslots": "*",
-            "formatversion": "2",
-            "format": "json"
-        }
-
-        pattern = re.compile(r"\| Rarity = ([a-zA-Z]+)")
-        page_results = await self.bot.fetch(url, params=page_params)
-        rarity = None
-
-        for page in page_results["query"]["pages"]:
-
-            content = page["revisions"][0]["slots"]["main"]["content"]
-
-            if pattern.search(content):
-                rarity = pattern.search(content).group(1)
-
-            if not rarity:
-                print(f"Failed to get rarity for page: {page['title']}, might need to be manually added.")
-                continue
-
-            guild_ids = FISH_GUILDS[rarity]
-
-            rarity_ids = {"Normal": 1,
-                          "Rare": 2,
-                          "Elite": 3,
-                          "Super": 4,
-                          "Decisive": 5,
-                          "Ultra": 5,
-                          "Priority": 5}
-
-            rarity_id = rarity_ids[rarity]
-
-            url = await self.get_icon_url(page["title"])
-            kai_check = await self.get_icon_url(page["title"] + "Kai")
-
-            await self.emote_in_fish_guild(ctx, rarity_id, guild_ids, url)
-
-            if kai_check:
-                await self.emote_in_fish_guild(ctx, rarity_id, guild_ids, kai_check)
-
-    async def get_icon_url(self, page_title):
-
-        params = {
-            "aisort": "name",
-            "action": "query",
-            "format": "json",
-            "aimime": "image/png",
-            "list": "allimages"
-        }
-
-        page_title = f"{page_title}Icon.png"
-
-        params["aiprefix"] = page_title.replace("_", " ")
-
-        js = await self.bot.fetch("https://azurlane.koumakan.jp/w/api.php", params=params)
-
-        for js in js["query"]["allimages"]:
-            return js["url"]
-
-    async def insert_fish(self, ctx, emote, rarity_id):
-        await ctx.db.execute("""
-            INSERT INTO fish (fish_name, rarity_id) VALUES ($1, $2) 
-            ON CONFLICT (fish_name) DO UPDATE SET rarity_id = $2;""", str(emote), rarity_id)
-
-    def check_all_emotes(self, guild_ids, emote_name) -> typing.Union[discord.Emoji, bool]:
-        emotes = []
-        for guild in guild_ids:
-            guild = self.bot.get_guild(guild)
-            for e in guild.emojis:
-                emotes.append(e)
-
-        for emote in emotes:
-            if emote.name == emote_name or emote.name == re.sub(r"[^a-zA-Z0-9]", "", emote_name):
-                return emote
-
-        return False
-
-    async def emote_in_fish_guild(self, ctx, rarity, guild_ids, icon_url):
-        # this is hacky and lazy but meh
-
-        if not icon_url:
-            return
-        already_emoted = False
-        emote_name = icon_url.split("/")[-1].replace(".png", "")
-
-        for guild in guild_ids:
-
-            guild = self.bot.get_guild(guild)
-
-            if len(guild.emojis) == 50:
-                continue
-
-            async with self.bot.session.get(icon_url) as response:
-                image = await response.read()
-
-                emote = self.check_all_emotes(guild_ids, emote_name)
-                if emote:
-                    # attempt to add the fish in-case the emote exists but it's not added to the database
-                    await self.insert_fish(ctx, emote, rarity)
-                    print(f"Inserted into database {emote.name} with emote location guild {guild.name} with id "
-                          f"{guild.id}.")
-
-                    already_emoted = True
-
-                    continue
-
-                try:
-                    if already_emoted:
-                        continue
-
-                    emoji = await guild.create_custom_emoji(name=emote_name, image=image, reason=None)
-                    print(f"Inserted into database {emote_name} and uploaded to guild {guild.name} with id {guild.id}.")
-                    await self.insert_fish(ctx, emoji, rarity)
-
-                except discord.errors.HTTPException as e:
-                    if e.status == 400:
-                        msg = f"at guild {guild.name} with id {guild.id} for emote {emote_name}."
-                        print(f":no_entry: | an error occurred during the emote process ```{e.text}```\n{msg}.")
-                    # attempting to appease the input validation by only allowing alpha
-                    emote_name = re.sub(r"[^a-zA-Z0-9]", "", emote_name)
-                    try:
-                        emoji = await guild.create_custom_emoji(name=emote_name, image=image, reason=None)
-                        await self.insert_fish(ctx, emoji, rarity)
-
-                    except discord.errors.HTTPException as e:
-                        msg = f"at guild {guild.name} with id {guild.id} for emote {emote_name}."
-                        print(f":no_entry: | an error occurred during the emote process ```{e.text}```\n{msg}.")
-                        print(f"Second attempt at adding {emote_name} failed dming link..... and rarity")
-                        author = ctx.bot.get_user(295325269558951936)
-                        message = f"Manually add {icon_url} for rarity {rarity}"
-                        await author.send(message)
-
     @commands.group(invoke_without_command=True, ignore_extra=False)
     @commands.cooldown(1, 3, commands.BucketType.user)
     async def fish(self, ctx: Context):
@@ -332,45 +195,26 @@ class Fishing(commands.Cog):
 
     @commands.command()
     @commands.is_owner()
-    async def update_fish(self, ctx):
-
-        cmcontinue = True
-
-        params = {
-
-            "action": "query",
-
-            "cmtitle": "Category:Ships",
-
-            "cmlimit": "500",
-
-            "list": "categorymembers",
-
-            "format": "json"
-
-        }
-
-        url = "https://azurlane.koumakan.jp/w/api.php"
-
-        while cmcontinue:
-            results = await self.bot.fetch(url, params=params)
-
-            try:
-
-                chunks = ctx.chunk(results["query"]["categorymembers"], 50)
-
-                for chunk in chunks:
-                    await self.get_pages_revisions(ctx, chunk, url)
-
-                cmcontinue = results["continue"]["cmcontinue"]
-                params["cmcontinue"] = cmcontinue
-
-            except KeyError:
-                # no more results available
-                cmcontinue = ""
-
-        print("Finished.")
-        await ctx.send(f"> Finished adding images {ctx.author.mention}")
+    @commands.max_concurrency(1)
+    async def update_fish(self, ctx, restart: bool = False):
+        """
+        Uploads an emote for every ship icon on the wiki and adds them as fish
+        pages finished by an earlier sync are skipped unless restart is True
+        """
+
+        async def titles():
+            async for member in self.wiki.category_members("Category:Ships"):
+                yield member["title"]
+
+        await ctx.send("> Syncing fish, this takes a while.")
+        report = await FishSync(self.bot, self.wiki, FISH_GUILDS, restart).run(titles())
+        details = report.details()
+
+        if details:
+            file = discord.File(BytesIO(details.encode()), filename="fish_sync.txt")
+            return await ctx.send(f"{report.summary()}\n{ctx.author.mention}", file=file)
+
+        await ctx.send(f"{report.summary()}\n{ctx.author.mention}")
 
 
 async def setup(bot):
@@ -11,7 +11,7 @@ from games.trivia import Triva
 from cogs.utils.games import *
 from config.utils.checks import checking_for_multiple_channel_instances
 from config.utils.converters import TriviaCategoryConverter, TriviaDiffcultyConventer, DieConventer
-from config.utils.menu import page_source
+from config.utils.menu import page_source, from_list, LazyPageSource
 from config.utils.context import Context
 
 
@@ -55,7 +55,7 @@ class Games(commands.Cog):
                            delete_after=3)
 
     @staticmethod
-    @page_source()
+    @page_source(parent=LazyPageSource)
     def trivia_source(self, menu, entries):
         res = "\n".join(f"> ID: `{result['question_id']}`: **{result['content']}**" for result in entries)
         return f"Category Name: ```{self.category}```\nAmount of questions ({self.amount})\n{res}"
@@ -152,9 +152,11 @@ class Games(commands.Cog):
                                             WHERE q.category_id = $1
                                             GROUP BY q.question_id, c.category_id""", category)
 
-        self.trivia_source.category = results[0]["category_name"]
-        self.trivia_source.amount = len(results)
-        pages = ctx.menu(self.trivia_source(results))
+        if not results:
+            return await ctx.send("> No questions have been added to this category yet.")
+
+        pages = ctx.menu(self.trivia_source(from_list(results), estimated_total=len(results),
+                                            category=results[0]["category_name"], amount=len(results)))
         await pages.start(ctx)
 
     @commands.command(aliases=["ttt"])
@@ -282,18 +282,9 @@ class Moderation(commands.Cog):
                     
                             """, ctx.guild.id, prefix, allow_default)
 
+        self.bot.set_guild_prefix(ctx.guild.id, prefix, allow_default)
         await ctx.send(f"The prefix for this guild is now {prefix}")
 
-    @set_prefix.after_invoke
-    async def set_prefix_after_invoke(self, ctx: Context):
-        # invalidating caches here
-        self.bot.prefix_invalidate(ctx.guild.id)
-        # invalidating the cache for every tag in this guild
-        async with ctx.acquire():
-            tags = await ctx.db.fetch("select tag_name from tags where guild_id = $1", ctx.guild.id)
-            for tag in tags:
-                self.bot.tags_invalidate(ctx.guild.id, tag["tag_name"])
-
 
 async def setup(bot):
     await bot.add_cog(Moderation(bot))
@@ -15,7 +15,7 @@ from discord.ext import commands, tasks
 
 from cogs.utils.imageboards import default_source
 
-from config.utils.menu import page_source
+from config.utils.menu import page_source, from_list
 from config.utils.converters import TriviaCategoryConverter, TriviaDiffcultyConventer, FishRarityConventer
 from config.utils.context import Context
 
@@ -32,7 +32,7 @@ async def random_images(ctx, tags="rating:safe score:>100"):
 
         results.append(result)
 
-    pages = ctx.global_menu(default_source(results))
+    pages = ctx.global_menu(default_source(from_list(results), estimated_total=len(results)))
     await pages.start(ctx)
 
 
@@ -224,6 +224,90 @@ class OwnerCog(commands.Cog, name="Owner Commands"):
 
         await ctx.send("successfully updated.")
 
+    @commands.group(invoke_without_command=True, name="pool")
+    async def pool_stats(self, ctx: Context, sort_by="hold_time"):
+        """View the connection pool and the commands holding connections the longest
+        sort by hold_time, wait_time, max_hold, max_wait, acquires or released_for_waits"""
+
+        if sort_by not in ("hold_time", "wait_time", "max_hold", "max_wait", "acquires", "released_for_waits"):
+            return await ctx.send(f":no_entry: | can't sort by `{sort_by}`.")
+
+        pool = self.bot.pool
+        embed = discord.Embed(title="Connection Pool", color=self.bot.default_colors())
+        embed.description = (f"**Size**: {pool.get_size()} / {pool.get_max_size()}"
+                             f"\n**Idle**: {pool.get_idle_size()}")
+
+        for name, record in self.bot.pool_stats.top(sort_by):
+            embed.add_field(name=name, value=f"acquires: {record.acquires}"
+                                             f"\nwait avg/max: {record.average_wait * 1000:.1f}/"
+                                             f"{record.max_wait * 1000:.1f}ms"
+                                             f"\nhold avg/max: {record.average_hold:.2f}/{record.max_hold:.2f}s"
+                                             f"\nreleased for waits: {record.released_for_waits}")
+
+        await ctx.send(embed=embed)
+
+    @pool_stats.command(name="reset")
+    async def pool_stats_reset(self, ctx: Context):
+        """Reset the recorded pool stats"""
+        self.bot.pool_stats.clear()
+        await ctx.send("> successfully reset.")
+
+    @commands.command(name="http")
+    async def http_stats(self, ctx: Context):
+        """View the queue and wait times of the shared http client per host"""
+
+        request = self.bot.request
+        cache = request.cache
+        embed = discord.Embed(title="HTTP Client", color=self.bot.default_colors())
+        embed.description = (f"**Cached responses**: {len(cache)} / {cache.maxsize}"
+                             f"\n**Hits**: {cache.hits} **Misses**: {cache.misses} "
+                             f"**Revalidated**: {cache.revalidated}")
+
+        for host, limit in sorted(request.limits.items(), key=lambda item: item[1].requests, reverse=True)[:24]:
+            embed.add_field(name=host, value=f"requests: {limit.requests}"
+                                             f"\nqueued/in flight: {limit.waiting}/{limit.in_flight}"
+                                             f"\nwait avg/max: {limit.average_wait:.2f}/{limit.max_wait:.2f}s"
+                                             f"\nrate: {limit.rate}/{limit.per}s tokens: {limit.tokens:.1f}"
+                                             f"\nblocked for: {limit.blocked_for:.0f}s")
+
+        anime = self.bot.get_cog("Anime")
+
+        if anime and anime.trace_moe_api.quota is not None:
+            trace = anime.trace_moe_api
+            embed.set_footer(text=f"trace.moe quota used {trace.quota_used} / {trace.quota}")
+
+        await ctx.send(embed=embed)
+
+    @commands.command(name="render")
+    async def render_stats(self, ctx: Context):
+        """View the render cache and the templates and fonts each render worker has loaded"""
+
+        images = self.bot.get_cog("Images")
+
+        if images is None or not images.engine.reports:
+            return await ctx.send("> No render workers have been warmed.")
+
+        cache = images.engine.cache
+        embed = discord.Embed(title="Render Workers", color=self.bot.default_colors())
+        embed.description = (f"**Cached renders**: {len(cache)} ({h.naturalsize(cache.size)} / "
+                             f"{h.naturalsize(cache.budget)})"
+                             f"\n**Hits**: {cache.hits} **Disk hits**: {cache.disk_hits} **Misses**: {cache.misses}")
+
+        if cache.directory:
+            embed.description += f"\n**Spilled**: {h.naturalsize(cache.disk_size)} / {h.naturalsize(cache.disk_budget)}"
+
+        for pid, report in list(images.engine.reports.items())[:24]:
+            slowest = "\n".join(f"{load.name.split('/')[-1]}: {load.seconds * 1000:.1f}ms"
+                                 for load in report.slowest())
+            failed = ", ".join(load.name.split("/")[-1] for load in report.failed) or "none"
+            embed.add_field(name=f"worker {pid}", value=f"assets: {len(report.loads)} "
+                                                        f"({h.naturalsize(report.size)})"
+                                                        f"\nwarmup: {report.seconds:.2f}s"
+                                                        f"\nslowest:\n{slowest}"
+                                                        f"\nfailed: {failed}")
+
+        await ctx.send(embed=embed)
+
     @commands.command()
     async def add_fish(self, ctx:  Context, fish_emote: discord.Emoji, rarity_id: FishRarityConventer):
         """Add a fish to the fish table"""
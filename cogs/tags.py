@@ -10,8 +10,9 @@ import discord
 from discord.ext import commands
 
 from config.utils.converters import TagNameConverter
-from config.utils.menu import page_source
+from config.utils.menu import page_source, keyset_rows, from_list, LazyPageSource
 from config.utils.context import Context
+from config.utils.tag_index import did_you_mean
 
 import loadconfig
 
@@ -33,11 +34,16 @@ class Tags(commands.Cog):
         self.cd = commands.CooldownMapping.from_cooldown(1, 4, commands.BucketType.member)
         self.emotes = {1: "🥇", 2: "🥈", 3: "🥉"}
 
-    async def invalidate_user_tags(self, ctx: Context, member: discord.Member):
-        tag_names = await ctx.db.fetch("SELECT tag_name from tags where guild_id = $1 and user_id = $2",
-                                       ctx.guild.id, member.id)
-        for name in tag_names:
-            self.bot.tags_invalidate(ctx.guild.id, name)
+    async def invalidate_user_tags(self, ctx: Context, member: discord.Member, tags: list = None,
+                                   refresh_index=False):
+        if tags is None:
+            tags = await ctx.db.fetch("SELECT tag_name from tags where guild_id = $1 and user_id = $2",
+                                      ctx.guild.id, member.id)
+        for tag in tags:
+            self.bot.tags_invalidate(ctx.guild.id, tag["tag_name"], refresh_index)
+
+    def did_you_mean(self, guild_id: int, name: str):
+        return did_you_mean(self.bot.tag_index.suggestions(guild_id, name))
 
     @staticmethod
     @page_source()
@@ -46,14 +52,29 @@ class Tags(commands.Cog):
         return "".join((f'\n> **{tag["tag_name"]}** (ID: {tag["tag_id"]})' for tag in entries))
 
     @staticmethod
-    @page_source()
+    @page_source(parent=LazyPageSource)
     def search_source(self, menu, entries: list):
 
-        return f"> Tags found that contained `{self.name}`\n" + "\n".join((f"(**{tag['tag_name']}**)" for tag in entries))
+        return f"> Tags found that contained `{self.name}`\n" + "\n".join((f"(**{tag}**)" for tag in entries))
+
+    @staticmethod
+    @page_source(parent=LazyPageSource)
+    def tag_list_source(self, menu, entries: list):
+        tags = "\n".join(f"Tag name: **{tag['tag_name']}** created by "
+                         f"**{str(self.guild.get_member(tag['user_id']))}**" for tag in entries)
+
+        embed = discord.Embed(title="Tags for:", description=self.guild.name, colour=discord.Color.dark_magenta())
+        embed.add_field(name='\uFEFF', value=tags)
+        embed.set_footer(text=f"page {menu.current_page + 1} /{self.page_count}")
+        return embed
 
     async def cog_check(self, ctx: Context):
         return ctx.guild is not None
 
+    def tag_uses(self, guild_id: int, tag: asyncpg.Record):
+        # include uses that haven't been flushed to the database yet
+        return (tag["uses"] or 0) + self.bot.tag_usage.pending_tag(guild_id, tag["tag_name"])
+
     async def cog_before_invoke(self, ctx: Context):
         # acquire a connection to the pool before every command
         await ctx.acquire()
@@ -73,11 +94,12 @@ class Tags(commands.Cog):
         data = await ctx.db.fetch(query, ctx.guild.id, member.id)
 
         owned_tags = len(data)
-        owned_tags_usage = sum(r["uses"] for r in data)
+        owned_tags_usage = sum(self.tag_uses(ctx.guild.id, r) for r in data)
 
         total_tags_uses = await ctx.db.fetchval("""SELECT SUM(uses) FROM user_tag_usage WHERE guild_id = $1 and user_id 
                                                     = $2""",
                                                 ctx.guild.id, member.id)
+        total_tags_uses = (total_tags_uses or 0) + self.bot.tag_usage.pending_user(ctx.guild.id, member.id)
 
         embed = discord.Embed(title="Tag Stats",
                               color=self.bot.default_colors())
@@ -86,8 +108,8 @@ class Tags(commands.Cog):
         embed.add_field(name="Owned Tags (used)", value=h.intcomma(owned_tags_usage), inline=True)
         embed.add_field(name="Total tags used", value=h.intcomma(total_tags_uses), inline=True)
 
-        value = "\n".join(f"{self.emotes[r['rank']]}: {r['tag_name']} ({h.intcomma(r['uses'])} times)"
-                          for r in data[:3]) or 0
+        value = "\n".join(f"{self.emotes[r['rank']]}: {r['tag_name']} ({h.intcomma(self.tag_uses(ctx.guild.id, r))} "
+                          f"times)" for r in data[:3]) or 0
 
         embed.add_field(name="Top Owned Tags", value=value)
         embed.set_author(name=member.name, icon_url=str(member.avatar.url))
@@ -112,7 +134,7 @@ class Tags(commands.Cog):
 
         top_creators = Counter(r["user_id"] for r in data).most_common(3)
 
-        description = f"{len(data)} tags, {sum(r['uses'] for r in data)} tag uses"
+        description = f"{len(data)} tags, {sum(self.tag_uses(ctx.guild.id, r) for r in data)} tag uses"
 
         embed = discord.Embed(title="Tag Stats",
                               color=self.bot.default_colors())
@@ -123,8 +145,8 @@ class Tags(commands.Cog):
                           for i, t in enumerate(top_creators))
         embed.add_field(name="Top Tag Creators", value=value, inline=False)
 
-        value = "\n".join(f"{self.emotes[r['rank']]}: {r['tag_name']} ({h.intcomma(r['uses'])} times)"
-                          for r in data[:3])
+        value = "\n".join(f"{self.emotes[r['rank']]}: {r['tag_name']} ({h.intcomma(self.tag_uses(ctx.guild.id, r))} "
+                          f"times)" for r in data[:3])
         embed.add_field(name="Top Tags", value=value, inline=False)
 
         query = """
@@ -141,7 +163,9 @@ class Tags(commands.Cog):
 
         data = await ctx.db.fetch(query, ctx.guild.id)
 
-        value = "\n".join(f"{r['rank']}: <@{r['user_id']}> ({h.intcomma(r['uses'])} used)" for r in data)
+        pending = self.bot.tag_usage.pending_user
+        value = "\n".join(f"{r['rank']}: <@{r['user_id']}> "
+                          f"({h.intcomma(r['uses'] + pending(ctx.guild.id, r['user_id']))} used)" for r in data)
 
         embed.add_field(name="Top Users", value=value, inline=False)
 
@@ -159,6 +183,8 @@ class Tags(commands.Cog):
         except asyncpg.UniqueViolationError:
             return await ctx.send(f":information_source: | tag name already exists")
 
+        ctx.bot.tag_index.add(ctx.guild.id, name)
+
         if len(name.split(" ")) >= 2:
             name = f"\"{name}\""
 
@@ -177,8 +203,9 @@ class Tags(commands.Cog):
 
     async def check_failure(self, tag: asyncpg.Record, name: str, guild_id: int):
         if not tag:
-            # if it failed to find a tag invalidate the cache for it
-            self.bot.tags_invalidate(guild_id, name)
+            # the index was stale, drop the name from it and invalidate the cache for it
+            self.bot.tag_index.remove(guild_id, name)
+            self.bot.tags_invalidate(guild_id, name, refresh_index=False)
             return True
         return False
 
@@ -229,23 +256,29 @@ class Tags(commands.Cog):
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
-        # still crude as hell
-        # getting the context to check if the message contains a prefix
-        ctx = await self.bot.get_context(message)
+        if not message.guild or message.author.bot:
+            return
 
-        if not message.guild or message.author.bot or not ctx.prefix:
+        # the parsed prefix is shared with the other listeners for this message
+        parsed = await self.bot.parse_message(message)
+
+        if not parsed.prefix:
             return
 
-        data = await self.bot.get_guild_prefix(message.guild.id)
+        guild_prefix = await self.bot.get_guild_prefixes(message.guild.id)
 
         allow_default = False
 
-        if data["prefix"]:
-            allow_default = data["allow_default"]
+        if guild_prefix.prefix:
+            allow_default = guild_prefix.allow_default
+
+        content = message.content.lower()
 
-        content = ctx.message.content.lower()
+        tag_name = content.replace(parsed.prefix, "", 1)
 
-        tag_name = content.replace(ctx.prefix, "", 1)
+        # most prefixed messages are commands and not tags, those never need to reach the database
+        if not self.bot.tag_index.contains(message.guild.id, tag_name):
+            return
 
         tag = await self.bot.get_tag(message.guild.id, tag_name)
         check = await self.check_failure(tag, tag_name, message.guild.id)
@@ -253,7 +286,7 @@ class Tags(commands.Cog):
         if check:
             return
 
-        ptn = self.prefixed_tag_names(allow_default, ctx.prefix, tag)
+        ptn = self.prefixed_tag_names(allow_default, parsed.prefix, tag)
 
         if content in ptn:
             bucket = self.cd.get_bucket(message)
@@ -263,14 +296,8 @@ class Tags(commands.Cog):
                                                   delete_after=3)
 
             await send_tag_content(tag, message)
-            await ctx.acquire()
-            await ctx.db.execute("UPDATE tags SET uses = uses + 1 WHERE tag_name = $1 AND guild_id = $2",
-                                 tag_name, message.guild.id)
-
-            await ctx.db.execute("UPDATE user_tag_usage SET uses = uses + 1 WHERE user_id = $1 AND guild_id = $2",
-                                 message.author.id, message.guild.id)
-
-            await ctx.release()
+            # written in batches by the bot's tag usage flush
+            self.bot.tag_usage.add(message.guild.id, tag["tag_name"], message.author.id)
 
     @commands.group(invoke_without_command=True, aliases=["tags"])
     async def tag(self, ctx: Context, member: discord.Member = None):
@@ -299,7 +326,8 @@ class Tags(commands.Cog):
             "SELECT tag_id, user_id FROM tags WHERE guild_id = $1 AND LOWER(tag_name) = $2",
             ctx.guild.id, name.lower())
         if data is None:
-            return await ctx.send(f'A tag with the name of "{name}" does not exist.')
+            return await ctx.send(f'A tag with the name of "{name}" does not exist.'
+                                  + self.did_you_mean(ctx.guild.id, name))
 
         try:
             member = ctx.guild.get_member(data["user_id"]) or await ctx.guild.fetch_member(data["user_id"])
@@ -322,7 +350,8 @@ class Tags(commands.Cog):
                                         name.lower(), ctx.guild.id)
 
         if not content:
-            return await ctx.send(f":no_entry: | could not find the tag {name}.")
+            return await ctx.send(f":no_entry: | could not find the tag {name}."
+                                  + self.did_you_mean(ctx.guild.id, name))
 
         if content["nsfw"] and not ctx.channel.nsfw:
             return await ctx.send(":no_entry: | this tag can only be used in nsfw channels.", delete_after=4)
@@ -357,14 +386,14 @@ class Tags(commands.Cog):
         data = await ctx.db.fetchrow(query, ctx.guild.id, name)
 
         if not data:
-            return await ctx.send(f"> A tag with name `{name}` does not exist.")
+            return await ctx.send(f"> A tag with name `{name}` does not exist." + self.did_you_mean(ctx.guild.id, name))
 
         embed = discord.Embed(title=name,
                               color=self.bot.default_colors())
 
         member = ctx.guild.get_member(data["user_id"]) or await self.bot.fetch_user(data["user_id"])
         date = h.naturaltime(datetime.datetime.utcnow() - data["created_at"])
-        uses = h.intcomma(data["uses"])
+        uses = h.intcomma(self.tag_uses(ctx.guild.id, data))
         embed.add_field(name="Owner", value=member.name, inline=False)
         embed.add_field(name="Nsfw", value=data["nsfw"], inline=False)
         embed.add_field(name="Created", value=date, inline=False)
@@ -400,35 +429,23 @@ class Tags(commands.Cog):
     @tag.command(ignore_extra=False)
     async def list(self, ctx: Context):
         """Get a list of tags for the current guild"""
-        query = """
-            WITH stats AS (
-                SELECT tag_name, user_id,
-                       RANK() OVER ( ORDER BY uses DESC) rank
-                FROM tags
-                WHERE guild_id = $1
-                )
-                SELECT tag_name, user_id, rank
-                FROM stats
-                    """
-
-        tags = await ctx.db.fetch(query, ctx.guild.id)
-
-        if not tags:
+        # keyset paginated on tags_guild_name_idx, only the pages that are viewed are fetched
+        query = """SELECT tag_name, user_id
+                   FROM tags
+                   WHERE guild_id = $3 AND tag_name IS NOT NULL
+                   AND ($1::text IS NULL OR LOWER(tag_name) > $1::text)
+                   ORDER BY LOWER(tag_name)
+                   LIMIT $2"""
+
+        rows = keyset_rows(ctx.pool, query, ctx.guild.id, key=lambda tag: tag["tag_name"].lower(), batch=10)
+        source = self.tag_list_source(rows, estimated_total=self.bot.tag_index.count(ctx.guild.id),
+                                      guild=ctx.guild)
+        await source.prepare()
+
+        if not source.entries:
             return await ctx.send("> Currently no tags for this guild exist.")
 
-        tags = [f"Tag name: **{tag['tag_name']}** created by "
-                f"**{str(ctx.guild.get_member(tag['user_id']))}**" for tag in tags if tag['tag_name']]
-
-        entries = []
-        tags_chunks = ctx.chunk(tags, 10)
-
-        for tags in tags_chunks:
-            tags = "\n".join(tags)
-            embed = discord.Embed(title="Tags for:", description=ctx.guild.name, colour=discord.Color.dark_magenta())
-            embed.add_field(name='\uFEFF', value=tags)
-            entries.append(embed)
-
-        pages = ctx.menu(ctx.list_source(entries))
+        pages = ctx.menu(source)
         await pages.start(ctx)
 
     @tag.group(invoke_without_command=True, aliases=["remove", "prune"])
@@ -453,6 +470,8 @@ class Tags(commands.Cog):
             return await ctx.send(":no_entry: | tag deletion failed, either the tag doesn't exist or you lack "
                                   "the permissions to do so.")
 
+        self.bot.tag_index.remove(ctx.guild.id, name)
+
         await ctx.send(f"> tag `{name}` successfully deleted.")
 
     @delete.command(name="all")
@@ -463,12 +482,16 @@ class Tags(commands.Cog):
 
         if check:
 
-            deleted = await ctx.db.fetch("DELETE from tags where guild_id = $1 and user_id = $2 RETURNING tag_id",
+            deleted = await ctx.db.fetch("""DELETE from tags where guild_id = $1 and user_id = $2 
+                                            RETURNING tag_id, tag_name""",
                                          ctx.guild.id, member.id)
             if deleted == []:
                 return await ctx.send(f"> {member.name} has no tags to delete.")
 
-            await self.invalidate_user_tags(ctx, member)
+            for tag in deleted:
+                self.bot.tag_index.remove(ctx.guild.id, tag["tag_name"])
+
+            await self.invalidate_user_tags(ctx, member, deleted)
             await ctx.send(f"> successfully deleted {len(deleted)} from {member.name}.")
 
         await ctx.send(":no_entry: | you need manage message permissions for this command.")
@@ -516,10 +539,11 @@ class Tags(commands.Cog):
             if not result:
                 return await ctx.send(f":no_entry: | {member.name} has no tags.")
 
+            await self.invalidate_user_tags(ctx, member)
+
             if nsfw:
                 return await ctx.send(f"> set all of {member.name} tags to NSFW")
 
-            await self.invalidate_user_tags(ctx, member)
             await ctx.send(f"> set all of {member.name} tags to not NSFW")
 
         else:
@@ -550,19 +574,20 @@ class Tags(commands.Cog):
         """Search for tags that start with a name"""
         name = name.lower()
 
-        results = await ctx.db.fetch("SELECT tag_name from tags where guild_id = $1 and LOWER(tag_name) like $2 || '%'",
-                                     ctx.guild.id, name)
+        # the trie is walked only as far as the pages being viewed
+        source = self.search_source(from_list(self.bot.tag_index.iter_search(ctx.guild.id, name)), name=name)
+        await source.prepare()
 
-        if not results:
-            return await ctx.send(f":no_entry: | could not find the tag {name}.")
+        if not source.entries:
+            return await ctx.send(f":no_entry: | could not find the tag {name}."
+                                  + self.did_you_mean(ctx.guild.id, name))
 
-        self.search_source.name = name
-        pages = ctx.menu(self.search_source(results))
+        pages = ctx.menu(source)
         await pages.start(ctx)
 
     @update_content.after_invoke
     async def after_tag_update(self, ctx: Context):
-        self.bot.tags_invalidate(ctx.guild.id, ctx.args[-1])
+        self.bot.tags_invalidate(ctx.guild.id, ctx.args[-1], refresh_index=False)
 
     @delete.after_invoke
     @nsfw.after_invoke
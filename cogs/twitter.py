@@ -15,14 +15,11 @@ class Twitter(commands.Cog):
 
         self.bot = bot
 
-    @cache.cache()
-    async def check_replace(self, ctx):
-        async with ctx.acquire():
-            if ctx.guild:
-                return await ctx.db.fetchval("SELECT replace_twitter_links FROM guilds WHERE guild_id = $1",
-                                             ctx.guild.id)
-
-        return True
+    @cache.cache(ttl=600)
+    async def check_replace(self, guild_id):
+        # keyed on the guild id since a context is unique per message
+        return await self.bot.pool.fetchval("SELECT replace_twitter_links FROM guilds WHERE guild_id = $1",
+                                            guild_id)
 
     async def send_new_link(self, match: re.Match, regex: re.Pattern,
                             groups: namedtuple, message: discord.Message) -> [None, discord.Message]:
@@ -89,24 +86,25 @@ class Twitter(commands.Cog):
             True for yes False for no"""
 
         await ctx.db.execute("UPDATE guilds SET replace_twitter_links = $1 WHERE guild_id = $2", allow, ctx.guild.id)
+        self.check_replace.invalidate(self, ctx.guild.id)
         await ctx.send("Now replacing twitter links.", delete_after=5)
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
-        # lazily done
-        ctx = await self.bot.get_context(message)
+        if message.author.bot:
+            return
+
+        # the parsed prefix is shared with the other listeners for this message
+        parsed = await self.bot.parse_message(message)
 
-        if ctx.guild:
-            allow = await self.check_replace(ctx)
+        if message.guild:
+            allow = await self.check_replace(message.guild.id)
         else:
             allow = True
 
         groups = namedtuple("group", "first second third")
 
-        if message.author.bot:
-            return
-
-        if ctx.prefix:
+        if parsed.prefix:
             groups = groups(r"\g<3>", 4, 5)
             prefixes = r"((" + __prefix__ + ")"
             regex = prefixes + "https?:\/\/)?(?:www\.)?(twitter)\.com\/(?:#!\/)?(\w+)\/status(?:es)?\/(\d+)"
@@ -1,11 +1,10 @@
-import asyncio
-import collections
+import collections.abc
+import json
 
-from discord.ext import tasks
-
-from python_graphql_client import GraphqlClient
+from collections import namedtuple
 
 from cogs.error_handler import RequestFailed
+from config.utils import cache
 
 from queries.seasonal import search_seasonal
 from queries.schedule import search_schedule
@@ -20,14 +19,24 @@ from queries.variables.schedule_vars import get_schedule
 
 ANI_LIST_URL = "https://graphql.anilist.co"
 
+# seconds a response is cached for by the kind of query, airing data changes daily and media hardly ever
+QUERY_TTLS = {
+    "seasonal": 6 * 60 * 60,
+    # under the hour AiringSchedule refreshes on so each refresh gets new data
+    "schedule": 50 * 60,
+    "media": 2 * 24 * 60 * 60,
+    "recommendations": 2 * 24 * 60 * 60,
+    "staff": 2 * 24 * 60 * 60,
+}
+
+AniListResponse = namedtuple("AniListResponse", "kind data")
+
 
 class AniListApi:
 
-    def __init__(self):
-        self.client = GraphqlClient(ANI_LIST_URL)
-        self.lock = asyncio.Lock()
-        self.unlocked = asyncio.Event()
-        self.set_lock.start()
+    def __init__(self, bot):
+        # the bot's request is only set once it has logged in
+        self.bot = bot
 
     # taken from
     # https://github.com/ScriptSmith/socialreaper/blob/master/socialreaper/tools.py#L8
@@ -43,7 +52,7 @@ class AniListApi:
         items = []
         for key, value in dictionary.items():
             new_key = str(parent_key) + separator + key if parent_key else key
-            if isinstance(value, collections.MutableMapping):
+            if isinstance(value, collections.abc.MutableMapping):
                 items.extend(self.flatten(value, new_key, separator).items())
             elif isinstance(value, list):
                 for k, v in enumerate(value):
@@ -52,35 +61,55 @@ class AniListApi:
                 items.append((new_key, value))
         return dict(items)
 
-    @tasks.loop(seconds=1)
-    async def set_lock(self):
-        if self.lock.locked() is False:
-            self.unlocked.set()
-        else:
-            self.unlocked.clear()
+    @staticmethod
+    def payload(query, variables):
+        # whitespace, the order of the variables and the case of a search don't change the response
+        if variables and isinstance(variables.get("search"), str):
+            variables = {**variables, "search": " ".join(variables["search"].lower().split())}
+
+        return json.dumps({"query": " ".join(query.split()), "variables": variables}, sort_keys=True)
 
-    async def call_anilist_api(self, query, variables=None):
+    @cache.cache(maxsize=512, ttl=lambda response: QUERY_TTLS[response.kind])
+    async def fetch_payload(self, kind, payload):
+        # identical requests made while this one is in flight wait on it instead of making their own,
+        # graphql errors come back with a json body on a 4xx so those are returned like the data is
+        response = await self.bot.request.request("POST", ANI_LIST_URL, data=payload,
+                                                  headers={"Content-Type": "application/json"})
 
-        await self.unlocked.wait()
+        data = response.content
 
-        async with self.lock:
+        if not isinstance(data, dict):
+            raise RequestFailed(f"seems like an error occurred for this request this api might be experiencing "
+                                f"problems `{response.reason}`.")
 
-            data = await self.client.execute_async(query=query, variables=variables)
+        # only checked when a response is loaded, failures aren't cached
+        if all(not value for value in self.flatten(data).values()):
+            raise RequestFailed("Failed to get any data for this request.")
 
-            if all(not value for value in self.flatten(data).values()):
-                raise RequestFailed("Failed to get any data for this request.")
+        return AniListResponse(kind, data)
 
-            return data
+    cache_stats = staticmethod(fetch_payload.get_stats)
 
-    async def seasonal_search(self, year, season):
+    async def call_anilist_api(self, query, variables=None, kind="media"):
+        """The response is shared with every other caller of the same query, copy anything that gets modified"""
+
+        response = await self.fetch_payload(kind, self.payload(query, variables))
+        return response.data
+
+    async def seasonal_search(self, year, season, page=1):
         if season.lower().capitalize() == "Autumn":
             season = "FALL"
 
-        js = await self.call_anilist_api(search_seasonal(), get_seasonal(year=year, season=season))
+        variables = get_seasonal(year=year, season=season)
+
+        if variables:
+            variables["page"] = page
+
+        js = await self.call_anilist_api(search_seasonal(), variables, kind="seasonal")
         return js
 
     async def schedule_search(self, page="1"):
-        js = await self.call_anilist_api(search_schedule(), get_schedule(page))
+        js = await self.call_anilist_api(search_schedule(), get_schedule(page), kind="schedule")
         return js
 
     async def anime_search(self, name):
@@ -92,19 +121,21 @@ class AniListApi:
         return js
 
     async def anime_rec_by_title(self, name):
-        js = await self.call_anilist_api(search_recommendations(), get_by_title("ANIME", name))
+        js = await self.call_anilist_api(search_recommendations(), get_by_title("ANIME", name),
+                                         kind="recommendations")
         return js
 
     async def anime_rec_by_id(self, anime_id):
-        js = await self.call_anilist_api(search_recommendations(), get_by_id("ANIME", anime_id))
+        js = await self.call_anilist_api(search_recommendations(), get_by_id("ANIME", anime_id),
+                                         kind="recommendations")
         return js
 
     async def anime_staff_by_id(self, anime_id):
-        js = await self.call_anilist_api(search_staff(), get_by_id("ANIME", anime_id))
+        js = await self.call_anilist_api(search_staff(), get_by_id("ANIME", anime_id), kind="staff")
         return js
 
     async def anime_staff_by_title(self, name):
-        js = await self.call_anilist_api(search_staff(), get_by_title("ANIME", name))
+        js = await self.call_anilist_api(search_staff(), get_by_title("ANIME", name), kind="staff")
         return js
 
     async def manga_search(self, name):
@@ -116,18 +147,20 @@ class AniListApi:
         return js
 
     async def manga_rec_by_title(self, name):
-        js = await self.call_anilist_api(search_recommendations(), get_by_title("MANGA", name))
+        js = await self.call_anilist_api(search_recommendations(), get_by_title("MANGA", name),
+                                         kind="recommendations")
         return js
 
     async def manga_rec_by_id(self, anime_id):
-        js = await self.call_anilist_api(search_recommendations(), get_by_id("MANGA", anime_id))
+        js = await self.call_anilist_api(search_recommendations(), get_by_id("MANGA", anime_id),
+                                         kind="recommendations")
         return js
 
     async def manga_staff_by_id(self, manga_id):
-        js = await self.call_anilist_api(search_staff(), get_by_id("MANGA", manga_id))
+        js = await self.call_anilist_api(search_staff(), get_by_id("MANGA", manga_id), kind="staff")
         return js
 
     async def manga_staff_by_title(self, name):
-        js = await self.call_anilist_api(search_staff(), get_by_title("MANGA", name))
+        js = await self.call_anilist_api(search_staff(), get_by_title("MANGA", name), kind="staff")
         return js
 
@@ -0,0 +1,132 @@
+import os
+import time
+
+from collections import namedtuple
+from io import BytesIO
+
+from PIL import Image, ImageFont
+
+# size is in bytes, error is the reason it couldn't be loaded
+AssetLoad = namedtuple("AssetLoad", "kind name size seconds error")
+
+
+class WarmupReport:
+    """What an AssetCache loaded at startup, how long it took and how much memory it holds"""
+
+    def __init__(self, pid, loads):
+        self.pid = pid
+        self.loads = loads
+
+    @property
+    def seconds(self):
+        return sum(load.seconds for load in self.loads)
+
+    @property
+    def size(self):
+        return sum(load.size for load in self.loads)
+
+    @property
+    def failed(self):
+        return [load for load in self.loads if load.error]
+
+    def slowest(self, amount=3):
+        return sorted(self.loads, key=lambda load: load.seconds, reverse=True)[:amount]
+
+    def summary(self):
+        summary = (f"Render worker {self.pid} warmed {len(self.loads) - len(self.failed)} assets "
+                   f"({self.size / 1024 / 1024:.1f} MiB) in {self.seconds:.2f}s")
+
+        if self.failed:
+            summary += ", failed to load " + ", ".join(load.name for load in self.failed)
+
+        return summary
+
+
+class AssetCache:
+    """
+    Decoded templates and sized fonts, loaded once and only read from after
+    a template is copied for every render, fonts are shared since drawing with one doesn't change it
+    """
+
+    def __init__(self):
+        self.templates = {}
+        # every size of a font is read from the same file bytes
+        self.font_files = {}
+        self.fonts = {}
+        self.report = None
+
+    @staticmethod
+    def image_size(image):
+        # decoded size, not the size of the compressed file
+        return image.width * image.height * len(image.getbands())
+
+    @property
+    def template_bytes(self):
+        return sum(self.image_size(image) for image in self.templates.values())
+
+    @property
+    def font_bytes(self):
+        return sum(len(data) for data in self.font_files.values())
+
+    def load_template(self, path):
+        with Image.open(path) as file:
+            file.load()
+            image = self.templates[path] = file.copy()
+
+        return image
+
+    def load_font(self, path, size):
+        data = self.font_files.get(path)
+
+        if data is None:
+            with open(path, "rb") as file:
+                data = self.font_files[path] = file.read()
+
+        font = self.fonts[(path, size)] = ImageFont.truetype(BytesIO(data), size)
+        return font
+
+    def load(self, templates, fonts):
+        loads = []
+
+        for path in templates:
+            start = time.perf_counter()
+
+            try:
+                image = self.load_template(path)
+            except OSError as e:
+                loads.append(AssetLoad("template", path, 0, time.perf_counter() - start, str(e)))
+            else:
+                loads.append(AssetLoad("template", path, self.image_size(image), time.perf_counter() - start, None))
+
+        for path, size in fonts:
+            start = time.perf_counter()
+            # the file is only counted for the first size loaded from it
+            new_file = path not in self.font_files
+
+            try:
+                self.load_font(path, size)
+            except OSError as e:
+                loads.append(AssetLoad("font", f"{path} {size}", 0, time.perf_counter() - start, str(e)))
+            else:
+                loads.append(AssetLoad("font", f"{path} {size}", len(self.font_files[path]) if new_file else 0,
+                                       time.perf_counter() - start, None))
+
+        self.report = WarmupReport(os.getpid(), loads)
+        return self.report
+
+    def template(self, path):
+        image = self.templates.get(path)
+
+        if image is None:
+            # not part of the warmup, loaded now and kept like the rest
+            image = self.load_template(path)
+
+        return image.copy()
+
+    def font(self, path, size):
+        font = self.fonts.get((path, size))
+
+        if font is None:
+            font = self.load_font(path, size)
+
+        return font
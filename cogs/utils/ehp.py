@@ -0,0 +1,126 @@
+import numpy as np
+
+# name, hp, evasion
+AUXILIARY = (("Repair Tool", 500, 0),
+             ("Fire Suppressor", 226, 0),
+             ("Navy Camouflage", 44, 17),
+             ("Fuel Filter", 350, 5),
+             ("SG Radar", 0, 15),
+             ("Beaver Badge", 75, 35),
+             ("Improved Hydraulic Rudder", 60, 40))
+
+# only a single one can be equipped on a ship
+UNIQUE_AUXILIARY = ("Improved Hydraulic Rudder",)
+
+FORMATION_BONUS = {"single": -0.1, "diamond": 0, "double": 0.3}
+
+ENEMY_HIT_SWEEP = np.arange(1, 201)
+
+
+def ehp(hp, evasion, luck, evasion_rate, damage_reduction, enemy_hit, level_difference=0, enemy_luck=0):
+    """Every argument can be an array, the result is broadcast over all of them"""
+
+    accuracy = 0.1 + enemy_hit / (enemy_hit + evasion + 2) + (
+            (enemy_luck - luck + level_difference) * 0.001
+    ) - evasion_rate
+
+    accuracy = np.clip(accuracy, 0.1, 1)
+    return hp / (accuracy * (1 - damage_reduction))
+
+
+class AuxiliaryPairs:
+    """Every pair of auxiliary slots a ship can equip, in the order combinations_with_replacement gives them"""
+
+    def __init__(self, auxiliary=AUXILIARY):
+        self.names = np.array([name for name, _, _ in auxiliary])
+        self.hp = np.array([hp for _, hp, _ in auxiliary], dtype=np.float64)
+        self.evasion = np.array([evasion for _, _, evasion in auxiliary], dtype=np.float64)
+
+        first, second = np.triu_indices(len(auxiliary))
+        unique = np.isin(self.names[first], UNIQUE_AUXILIARY) & (first == second)
+        self.first, self.second = first[~unique], second[~unique]
+
+        self.pair_hp = self.hp[self.first] + self.hp[self.second]
+        self.pair_evasion = self.evasion[self.first] + self.evasion[self.second]
+
+    def __len__(self):
+        return len(self.first)
+
+    def slot(self, option):
+        """hp and evasion of a 1 indexed aux slot option, anything past the list is an empty slot"""
+
+        if 1 <= option <= len(self.names):
+            return self.hp[option - 1], self.evasion[option - 1]
+
+        return 0, 0
+
+    def pair(self, index):
+        return self.names[self.first[index]], self.names[self.second[index]]
+
+
+class ShipStats:
+    """The level 120 stats of every ship as columns, a row that isn't numbers like the csv header is left out"""
+
+    def __init__(self, rows):
+        names, hulls, stats = [], [], []
+        # id of a row -> its position, rows are looked up by name through the ShipIndex that owns them
+        self.positions = {}
+
+        for row in rows:
+            try:
+                values = [float(row[key]) for key in ("HP", "EVA", "LUK", "EVA Rate", "EVAS", "DMGR")]
+            except (TypeError, ValueError):
+                continue
+
+            self.positions[id(row)] = len(names)
+            names.append(row["Name"])
+            hulls.append(row["Hull"])
+            stats.append(values)
+
+        self.names = np.array(names)
+        self.hulls = np.array(hulls)
+
+        stats = np.array(stats, dtype=np.float64).reshape(-1, 6)
+        self.hp, self.evasion, self.luck, self.evasion_rate, self.evasion_stat, self.damage_reduction = stats.T
+
+    def position(self, row):
+        return self.positions.get(id(row))
+
+    def hull(self, hull):
+        return np.flatnonzero(np.char.lower(self.hulls) == hull.lower())
+
+    def ehp(self, ships, enemy_hit, pairs, formation="diamond", level_difference=0):
+        """
+        EHP of the ships with every aux pair, the last axis is the pairs
+        enemy_hit can be an array with a trailing axis of 1 to compute every hit value at once
+        """
+
+        ship_evasion = self.evasion[ships] * (1 + self.evasion_stat[ships] + FORMATION_BONUS.get(formation, 0))
+
+        return ehp(self.hp[ships][..., None] + pairs.pair_hp,
+                   ship_evasion[..., None] + pairs.pair_evasion,
+                   self.luck[ships][..., None],
+                   self.evasion_rate[ships][..., None],
+                   self.damage_reduction[ships][..., None],
+                   enemy_hit,
+                   level_difference)
+
+    def best(self, ships, enemy_hit, pairs):
+        """The best EHP of every ship and the index of the aux pair that gets it"""
+
+        values = self.ehp(ships, enemy_hit, pairs)
+        best = values.argmax(axis=-1)
+        return np.take_along_axis(values, best[..., None], axis=-1)[..., 0], best
+
+    def rank_hull(self, hull, enemy_hit, pairs):
+        """Every ship of a hull with its best EHP and aux pair, highest first"""
+
+        ships = self.hull(hull)
+        values, best = self.best(ships, enemy_hit, pairs)
+        order = np.argsort(values)[::-1]
+        return ships[order], values[order], best[order]
+
+    def sweep(self, ship, pairs, enemy_hits=ENEMY_HIT_SWEEP):
+        """The best EHP and aux pair of a ship for every enemy hit value"""
+
+        return self.best(np.array([ship]), enemy_hits[:, None, None], pairs)
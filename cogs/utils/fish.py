@@ -9,7 +9,7 @@ import discord
 from discord.ext import menus
 
 from config.utils.emojis import SHYBUKI2
-from config.utils.menu import page_source, BaseMenu
+from config.utils.menu import page_source, BaseMenu, LazyPageSource, keyset_rows
 from config.utils.context import Context
 
 
@@ -102,7 +102,7 @@ class Fishing:
         return entry
 
     @staticmethod
-    @page_source(per_page=4)
+    @page_source(per_page=4, parent=LazyPageSource)
     def view_source(self, menu, entries):
 
         def format_fish(fish):
@@ -295,27 +295,29 @@ class Fishing:
 
         message = f"""{SHYBUKI2} | **{user_name}'s current fish collection**.\n"""
 
-        data = await ctx.db.fetch("""SELECT DISTINCT fuc.fish_id, fuc.fish_name, fr.rarity_name as rarity, 
-                                        fuc.amount
-                                        FROM fish_users_catches fuc
-                                        INNER JOIN fish f ON
-                                        fuc.fish_id = f.fish_id
-                                        INNER JOIN fish_rarity fr ON f.rarity_id = fr.rarity_id
-                                        WHERE fuc.user_id = $1 AND 
-                                        ($2::integer is null or f.rarity_id = $2::integer)""",
-                                  user_id, rarity_id)
-
-        if rarity_id:
-            rarity = data[0]["rarity"]
-            message = f"""{SHYBUKI2} **{user_name}'s current {rarity} fish collection**.\n"""
-
-        if data == []:
+        # keyset paginated on the (user_id, fish_id) primary key, a page of catches is fetched per page turn
+        query = """SELECT fuc.fish_id, fuc.fish_name, fr.rarity_name as rarity, fuc.amount
+                   FROM fish_users_catches fuc
+                   INNER JOIN fish f ON fuc.fish_id = f.fish_id
+                   INNER JOIN fish_rarity fr ON f.rarity_id = fr.rarity_id
+                   WHERE fuc.user_id = $3
+                   AND ($1::smallint is null or fuc.fish_id > $1::smallint)
+                   AND ($4::integer is null or f.rarity_id = $4::integer)
+                   ORDER BY fuc.fish_id
+                   LIMIT $2"""
+
+        rows = keyset_rows(ctx.pool, query, user_id, rarity_id, key=lambda fish: fish["fish_id"], batch=4)
+        source = self.view_source(rows, m=message)
+        await source.prepare()
+
+        if not source.entries:
             return await ctx.send(message + "you currently have no fish caught.")
 
-        # for formatting
-        self.view_source.m = message
+        if rarity_id:
+            rarity = source.entries[0]["rarity"]
+            source.m = f"""{SHYBUKI2} **{user_name}'s current {rarity} fish collection**.\n"""
 
-        pages = menu(self.view_source(data))
+        pages = menu(source)
         await pages.start(ctx)
 
     async def get_favourites_rarity(self, ctx: Context, rarity_id: int):
@@ -0,0 +1,281 @@
+import asyncio
+import json
+import re
+
+from collections import namedtuple
+
+import aiohttp
+import discord
+
+from cogs.utils.snapshot import SnapshotWriter
+from cogs.utils.wiki import MAX_TITLES
+from config.utils.requests import RequestFailed
+
+FISH_SYNC_CHECKPOINT = "config/fish_sync.json"
+
+RARITY_PATTERN = re.compile(r"\| Rarity = ([a-zA-Z]+)")
+
+RARITY_IDS = {"Normal": 1,
+              "Rare": 2,
+              "Elite": 3,
+              "Super": 4,
+              "Decisive": 5,
+              "Ultra": 5,
+              "Priority": 5}
+
+# icons downloaded and emotes uploaded at once, discord limits emote uploads far more than the wiki's file host
+DOWNLOAD_CONCURRENCY = 4
+UPLOAD_CONCURRENCY = 2
+
+# name is the emote name, the icon's file name without .png
+Icon = namedtuple("Icon", "title name url rarity")
+
+
+def alphanumeric(name):
+    # discord refuses some names the wiki uses
+    return re.sub(r"[^a-zA-Z0-9]", "", name)
+
+
+def read_checkpoint(path=FISH_SYNC_CHECKPOINT):
+    try:
+        with open(path, "r") as file:
+            return set(json.load(file)["done"])
+
+    except FileNotFoundError:
+        return set()
+
+
+def write_checkpoint(file, done):
+    json.dump({"done": done}, file)
+
+
+class SyncReport:
+    """What a fish sync did to every page and icon, kept instead of printing as it goes"""
+
+    def __init__(self):
+        self.pages = 0
+        self.resumed = 0
+        self.icons = 0
+        self.existing = 0
+        self.uploaded = 0
+        self.inserted = 0
+        self.no_rarity = []
+        self.no_space = []
+        # (icon name, url, reason)
+        self.failed = []
+
+    def summary(self):
+        summary = (f"> synced {self.pages} pages, {self.resumed} finished in an earlier sync were skipped\n"
+                   f"> {self.icons} icons, {self.uploaded} uploaded and {self.existing} already emotes\n"
+                   f"> {self.inserted} fish inserted or updated")
+
+        if self.no_rarity:
+            summary += f"\n> {len(self.no_rarity)} pages without a rarity"
+
+        if self.no_space:
+            summary += f"\n> {len(self.no_space)} icons without a guild with a free emote slot"
+
+        if self.failed:
+            summary += f"\n> {len(self.failed)} icons failed, they need to be added manually"
+
+        return summary
+
+    def details(self):
+        """Everything that needs to be looked at by hand, one per line"""
+
+        lines = [f"no rarity: {title}" for title in self.no_rarity]
+        lines += [f"no free slot: {name}" for name in self.no_space]
+        lines += [f"failed: {name} {url} {reason}" for name, url, reason in self.failed]
+        return "\n".join(lines)
+
+
+class FishSync:
+    """
+    Uploads an emote for the icon of every ship page and inserts them as fish, a chunk of pages at a time
+    pages are fetched, their icons resolved, downloaded once and uploaded to the rarity's guild with the most
+    free slots, and the chunk's fish inserted in one query before the chunk is checkpointed
+
+    pages finished by an earlier sync are skipped, rerunning a page is harmless as existing emotes are reused
+    and fish are upserted
+    """
+
+    def __init__(self, bot, wiki, guilds, restart=False, path=FISH_SYNC_CHECKPOINT):
+        self.bot = bot
+        self.wiki = wiki
+        # rarity -> guild ids of its emotes
+        self.guilds = guilds
+        self.done = set() if restart else read_checkpoint(path)
+        # titles of the pages every icon was synced for, written a few seconds after a chunk finishes
+        self.checkpoint = SnapshotWriter(path, lambda: sorted(self.done), write_checkpoint)
+        self.download_semaphore = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+        self.upload_semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+        self.report = SyncReport()
+        # the emotes of every fish guild by name and the static emote slots each guild has left,
+        # built once and updated as emotes are uploaded
+        self.emojis = {}
+        self.free = {}
+
+        for guild_id in {guild_id for guild_ids in guilds.values() for guild_id in guild_ids}:
+            guild = bot.get_guild(guild_id)
+
+            if guild is None:
+                continue
+
+            self.free[guild.id] = guild.emoji_limit - sum(not emoji.animated for emoji in guild.emojis)
+
+            for emoji in guild.emojis:
+                self.emojis.setdefault(emoji.name, emoji)
+
+    async def run(self, titles):
+        """Syncs every title of an async iterator, returns the report"""
+
+        chunk = []
+
+        try:
+            async for title in titles:
+                if title in self.done:
+                    self.report.resumed += 1
+                    continue
+
+                chunk.append(title)
+
+                if len(chunk) == MAX_TITLES:
+                    await self.sync_chunk(chunk)
+                    chunk = []
+
+            if chunk:
+                await self.sync_chunk(chunk)
+
+        finally:
+            # a sync that failed part way resumes from the last finished chunk
+            await self.checkpoint.close()
+
+        return self.report
+
+    async def sync_chunk(self, titles):
+        rarities = await self.fetch_rarities(titles)
+        icons = await self.resolve_icons(rarities)
+        fish = await asyncio.gather(*(self.sync_icon(icon) for icon in icons))
+        await self.insert([f for f in fish if f is not None])
+
+        # pages with an icon that failed or a missing rarity are tried again by the next sync
+        failed = {icon.title for icon, f in zip(icons, fish) if f is None}
+        self.report.pages += len(titles)
+        self.done.update(title for title in rarities if title not in failed)
+        self.checkpoint.schedule()
+
+    async def fetch_rarities(self, titles):
+        rarities = {}
+
+        async for title, content in self.wiki.revisions(titles):
+            rarity = RARITY_PATTERN.search(content)
+
+            if rarity is None or rarity.group(1) not in RARITY_IDS:
+                self.report.no_rarity.append(title)
+                continue
+
+            rarities[title] = rarity.group(1)
+
+        return rarities
+
+    async def resolve_icons(self, rarities):
+        """The base and Kai icons that exist of every page, a single request for the whole chunk"""
+
+        names = {f"{title}{kai}Icon.png": (title, rarity)
+                 for title, rarity in rarities.items() for kai in ("", "Kai")}
+        urls = await self.wiki.file_urls(names)
+        icons = []
+
+        for file_name, url in urls.items():
+            title, rarity = names[file_name]
+            icons.append(Icon(title, url.split("/")[-1].replace(".png", ""), url, rarity))
+
+        self.report.icons += len(icons)
+        return icons
+
+    def existing_emoji(self, name):
+        return self.emojis.get(name) or self.emojis.get(alphanumeric(name))
+
+    def pick_guild(self, rarity):
+        """The guild of the rarity with the most free slots, the slot is taken until the upload fails"""
+
+        guild_ids = [guild_id for guild_id in self.guilds[rarity] if self.free.get(guild_id, 0) > 0]
+
+        if not guild_ids:
+            return None
+
+        guild_id = max(guild_ids, key=self.free.get)
+        self.free[guild_id] -= 1
+        return self.bot.get_guild(guild_id)
+
+    async def sync_icon(self, icon):
+        """Returns the emote and rarity id of the icon's fish, None if it has no emote"""
+
+        emoji = self.existing_emoji(icon.name)
+
+        if emoji is not None:
+            self.report.existing += 1
+            return str(emoji), RARITY_IDS[icon.rarity]
+
+        image = await self.download(icon)
+
+        if image is None:
+            return None
+
+        guild = self.pick_guild(icon.rarity)
+
+        if guild is None:
+            self.report.no_space.append(icon.name)
+            return None
+
+        emoji = await self.upload(guild, icon, image)
+
+        if emoji is None:
+            return None
+
+        self.report.uploaded += 1
+        return str(emoji), RARITY_IDS[icon.rarity]
+
+    async def download(self, icon):
+        async with self.download_semaphore:
+            try:
+                # not cached, every icon is only downloaded the once
+                return await self.bot.request.fetch(icon.url, ttl=0)
+
+            except (RequestFailed, asyncio.TimeoutError, aiohttp.ClientError) as e:
+                self.report.failed.append((icon.name, icon.url, f"download failed {e}"))
+                return None
+
+    async def upload(self, guild, icon, image):
+        reason = None
+
+        async with self.upload_semaphore:
+            # the name as it is then only alphanumeric if discord refuses it
+            for name in dict.fromkeys((icon.name, alphanumeric(icon.name))):
+                try:
+                    emoji = await guild.create_custom_emoji(name=name, image=image)
+
+                except discord.HTTPException as e:
+                    reason = f"upload to guild {guild.id} failed {e.text}"
+                    continue
+
+                self.emojis[emoji.name] = emoji
+                return emoji
+
+        self.free[guild.id] += 1
+        self.report.failed.append((icon.name, icon.url, reason))
+        return None
+
+    async def insert(self, fish):
+        if not fish:
+            return
+
+        # a fish is only in a single row of the upsert
+        fish = dict(fish)
+
+        await self.bot.pool.execute("""INSERT INTO fish (fish_name, rarity_id)
+                                       SELECT * FROM unnest($1::text[], $2::smallint[])
+                                       ON CONFLICT (fish_name) DO UPDATE SET rarity_id = EXCLUDED.rarity_id""",
+                                    list(fish.keys()), list(fish.values()))
+
+        self.report.inserted += len(fish)
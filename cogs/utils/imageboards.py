@@ -9,11 +9,10 @@ import discord
 
 from bs4 import BeautifulSoup
 
-from config.utils import requests
-from config.utils.menu import page_source
+from config.utils.menu import page_source, from_list, LazyPageSource
 
 
-@page_source(per_page=1)
+@page_source(per_page=1, parent=LazyPageSource)
 async def default_source(self, menu, entry):
 
     urls = re.findall(r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*(),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+",
@@ -40,7 +39,7 @@ async def default_source(self, menu, entry):
     embed = discord.Embed(colour=discord.Colour.dark_magenta(),
                           description=f"{cleaned_sources}\n```{cleaned_tags}```\n[Full size img url]({full_size})")
 
-    footer_text = f"page {menu.current_page + 1} /{self.get_max_pages()}"
+    footer_text = f"page {menu.current_page + 1} /{self.page_count}"
 
     embed.set_image(url=preview_url)
 
@@ -159,35 +158,51 @@ class AnimePicturesNet:
         if not posts:
             return []
 
-        posts = random.sample(posts, k=limit)
-        posts = [await self.fetch(url) for url in posts]
+        return random.sample(posts, k=limit)
+
+    async def iter_posts(self, urls):
+        """Fetches a post's page only once the menu reaches it"""
+
         post = namedtuple("post", "preview sources tags full_image")
-        results = set()
+        seen = set()
+
+        for url in urls:
+            self.soup = await self.fetch(url)
 
-        for content in posts:
-            self.soup = content
-            sources = " ".join(self.sources)
-            preview_url = self.preview_url
-            if preview_url:
-                results.add(post(preview_url, sources, self.tags.replace(":", ""), self.image_url))
+            try:
+                sources = " ".join(self.sources)
+                preview_url = self.preview_url
+                result = post(preview_url, sources, self.tags.replace(":", ""), self.image_url)
 
-        return list(results)
+            except TypeError as e:
+                # one of properties are returning None if a type error is raised
+                await self.ctx.reply("> A breaking change has occurred on anime-pictures.net "
+                                     "bot owner has been notified.")
+                raise e
+
+            if preview_url and result not in seen:
+                seen.add(result)
+                yield result
 
     async def get_posts(self, tags="", limit=1):
 
         try:
 
-            results = await self.post_request(limit, tags)
+            urls = await self.post_request(limit, tags)
 
         except TypeError as e:
             # one of properties are returning None if a type error is raised
             await self.ctx.reply("> A breaking change has occurred on anime-pictures.net bot owner has been notified.")
             raise e
 
-        if not results:
+        source = default_source(self.iter_posts(urls), estimated_total=len(urls))
+        # the first post is fetched here so a search with no usable posts can say so
+        await source.prepare()
+
+        if not source.entries:
             return await self.ctx.send(f":no_entry: | search failed with tags `{tags}`")
 
-        pages = self.ctx.global_menu(default_source(results))
+        pages = self.ctx.global_menu(source)
         await pages.start(self.ctx)
 
 
@@ -228,7 +243,8 @@ class _Moebooru:
 
         self.__site_name = ""
         self.__site_url = ""
-        self.request = requests.Request(bot, session)
+        # the bot's client so the boards share its per host limits and cache
+        self.request = bot.request
         self.site_name = site_name
         if not session:
             self.client = aiohttp.ClientSession(headers=headers)
@@ -392,7 +408,8 @@ class Moebooru(_Moebooru, MoebooruApiMixin):
                               js.get("source", " "), js.get("tags"),
                               js.get("file_url")))
 
-        pages = self.ctx.global_menu(default_source(list(pictures)))
+        pictures = list(pictures)
+        pages = self.ctx.global_menu(default_source(from_list(pictures), estimated_total=len(pictures)))
         await pages.start(self.ctx)
 
 
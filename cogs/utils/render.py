@@ -0,0 +1,291 @@
+import asyncio
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+from PIL import Image, ImageDraw
+
+from cogs.utils import text_layout
+from cogs.utils.assets import AssetCache
+from cogs.utils.render_cache import RenderCache, asset_version
+
+import loadconfig
+
+# worker processes for image commands, optional in loadconfig
+RENDER_WORKERS = getattr(loadconfig, "__render_workers__", 2)
+
+WHITNEY = "images/resources/fonts/Whitney-Medium.ttf"
+ARIAL_UNICODE = "images/resources/fonts/Arial-Unicode-Regular.ttf"
+DROID_SERIF = "images/resources/fonts/DroidSerif-Bold.ttf"
+
+TEMPLATES = ("images/rate.png", "images/clyde.png", "images/kick.png", "images/mouseicon.png", "images/sign.png",
+             "images/two_cats.jpg", "images/warnimage.PNG")
+
+# every (font, size) a recipe draws with
+FONTS = ((WHITNEY, 80), (WHITNEY, 16), (WHITNEY, 14), (WHITNEY, 12), (ARIAL_UNICODE, 60), (ARIAL_UNICODE, 18))
+
+# loaded once per worker process, recipes only ever read from it
+assets = AssetCache()
+
+
+def preload(templates=TEMPLATES, fonts=FONTS):
+    """Worker initializer, a file that's missing only fails the recipes that use it"""
+    assets.load(templates, fonts)
+
+
+def warmup_report():
+    return assets.report
+
+
+def template(path):
+    return assets.template(path)
+
+
+def font(path, size):
+    return assets.font(path, size)
+
+
+def circle_crop(image):
+    # the mask is drawn 4 times bigger and scaled down for smoother edges than ellipse by itself gives
+    big_size = (image.size[0] * 4, image.size[1] * 4)
+
+    with Image.new("L", big_size, 0) as mask:
+        draw = ImageDraw.Draw(mask)
+        draw.ellipse((0, 0) + big_size, fill=255)
+        image.putalpha(mask.resize(image.size, Image.LANCZOS))
+
+    return image
+
+
+class Canvas:
+    """A template being drawn on, every step works on the Image in memory"""
+
+    def __init__(self, path):
+        self.image = template(path)
+        self.draw = ImageDraw.Draw(self.image)
+        self.font = None
+
+    def font_setter(self, path, font_size=16, font_colour=(0, 0, 0)):
+        self.font = (font(path, font_size), font_colour)
+
+    def draw_text(self, text, coordinates, down=False):
+        font_, font_colour = self.font
+        text_layout.draw_text(self.draw, font_, font_colour, text, coordinates, vertical=down)
+
+    def draw_text_rotated(self, text, coordinates, rotate, down=False):
+        font_, font_colour = self.font
+
+        with text_layout.render_text(font_, font_colour, text, vertical=down, rotate=rotate) as rotated:
+            self.paste(coordinates, rotated)
+
+    def draw_circle(self, size, cords, fill):
+        with circle_crop(Image.new("RGB", size, fill)) as circle:
+            self.paste(cords, circle)
+
+    def paste(self, offset, image, alpha=True):
+        offset = tuple(int(x) for x in offset)
+
+        if alpha:
+            self.image.paste(image, offset, image)
+
+        else:
+            self.image.paste(image, offset)
+
+    def save(self):
+        buffer = BytesIO()
+        self.image.save(buffer, "PNG")
+        self.image.close()
+        return buffer.getvalue()
+
+
+def rate(number):
+    canvas = Canvas("images/rate.png")
+    canvas.font_setter(WHITNEY, 80)
+    canvas.draw_text(f"{number}/10", [185.5, 430] if number < 10 else [147.5, 430])
+    return canvas.save()
+
+
+def clyde(message):
+    canvas = Canvas("images/clyde.png")
+    canvas.font_setter(WHITNEY, font_colour=(255, 255, 255))
+    canvas.draw_text(message, [123, 86])
+    return canvas.save()
+
+
+def fake_kick(avatars, kick_text, ban_text, name_text, name_colour, online_text):
+    """avatars are the png bytes of the kicked member's avatar followed by the 5 members shown as online"""
+
+    canvas = Canvas("images/kick.png")
+
+    canvas.font_setter(WHITNEY, 14, (215, 66, 66))
+    canvas.draw_text(kick_text, [60, 382.5])
+    canvas.draw_text(ban_text, [60, 412.5])
+
+    canvas.font_setter(WHITNEY, 16, name_colour)
+    canvas.draw_text(name_text, [50, 36.5])
+
+    canvas.font_setter(WHITNEY, 12, (114, 130, 132))
+    canvas.draw_text(online_text, [68, 5])
+
+    mouse_icon = template("images/mouseicon.png")
+
+    # avatar, dark circle and online circle coordinates, every member after is drawn 44 pixels down
+    avatar_x, avatar_y = 9, 30
+    dark_circle_x, dark_circle_y = 28, 49
+    status_circle_x, status_circle_y = 31, 52
+    for data in avatars:
+
+        with Image.open(BytesIO(data)) as avatar:
+            # default avatars can't be requested at 32 pixels
+            if avatar.size != (32, 32):
+                avatar = avatar.resize((32, 32), Image.LANCZOS)
+
+            avatar = circle_crop(avatar.convert("RGBA"))
+
+        canvas.paste((avatar_x, avatar_y), avatar)
+        avatar.close()
+        canvas.paste((195, 385), mouse_icon)
+        canvas.draw_circle((15, 15), (dark_circle_x, dark_circle_y), (47, 49, 54))
+        canvas.draw_circle((10, 10), (status_circle_x, status_circle_y), (67, 181, 129))
+        avatar_y += 44
+        dark_circle_y += 44
+        status_circle_y += 44
+
+    mouse_icon.close()
+    return canvas.save()
+
+
+def sign(lines):
+    canvas = Canvas("images/sign.png")
+    canvas.font_setter(ARIAL_UNICODE, 60, (0, 0, 0))
+    canvas.draw_text_rotated(lines, [473, 190], 356, True)
+    return canvas.save()
+
+
+def two_cats(lines, lines_two):
+    canvas = Canvas("images/two_cats.jpg")
+    canvas.font_setter(ARIAL_UNICODE, 18, (6, 0, 15))
+    canvas.draw_text_rotated(lines, [67, 217], 358, True)
+    canvas.draw_text_rotated(lines_two, [268, 232], 358, True)
+    return canvas.save()
+
+
+def nimi(lines, date):
+    canvas = Canvas("images/warnimage.PNG")
+    canvas.font_setter(WHITNEY, font_colour=(193, 195, 197))
+    canvas.draw_text(lines, [81, 74], True)
+    canvas.font_setter(WHITNEY, 12, (108, 112, 119))
+    canvas.draw_text(date, [191, 6])
+    return canvas.save()
+
+
+RECIPES = {f.__name__: f for f in (rate, clyde, fake_kick, sign, two_cats, nimi)}
+
+
+def run(recipe, kwargs):
+    # runs in the worker, only the recipe's name, its arguments and the finished png cross the process boundary
+    return RECIPES[recipe](**kwargs)
+
+
+class RenderEngine:
+    """Renders a whole recipe as a single job in a pool of worker processes that keep the fonts and templates
+    loaded, so image commands don't hold the GIL the event loop needs or wait on each other's draw calls"""
+
+    def __init__(self, workers=RENDER_WORKERS, cache=None):
+        self.workers = workers
+        self.executor = None
+        # warms the workers of a pool that replaced a broken one
+        self.warming = None
+        # a report for every worker that has been warmed, keyed by its pid
+        self.reports = {}
+        # every recipe draws the same png for the same arguments, so renders are cached until an asset changes
+        self.cache = cache or RenderCache()
+        self.version = asset_version([*TEMPLATES, *{path for path, _ in FONTS}, __file__])
+        # renders in progress, the same render requested again waits on the first one
+        self.pending = {}
+
+    def start(self):
+        # spawned rather than forked so the workers don't inherit the bot's sockets and memory, spawning imports
+        # main.py again in every worker as __mp_main__ which builds a Victorique and registers its commands,
+        # it never connects so that's paid once per worker start and nothing after
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=preload)
+
+    def stop(self):
+        if self.warming is not None and not self.warming.done():
+            self.warming.cancel()
+
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def warmup(self):
+        """Starts the workers so the first commands don't wait on them loading the templates and fonts"""
+
+        loop = asyncio.get_running_loop()
+        # the pool starts a new worker for every job submitted while the others are busy
+        reports = await asyncio.gather(*(loop.run_in_executor(self.executor, warmup_report)
+                                         for _ in range(self.workers)))
+
+        for report in reports:
+            if report.pid not in self.reports:
+                self.reports[report.pid] = report
+                print(report.summary())
+
+        return reports
+
+    def restart(self):
+        self.stop()
+        self.reports.clear()
+        self.start()
+        # in the background so the render that found the pool broken isn't held up by it
+        self.warming = asyncio.create_task(self.rewarm())
+
+    async def rewarm(self):
+        try:
+            await self.warmup()
+        except BrokenProcessPool:
+            # replaced again by the next render
+            pass
+
+    async def run(self, recipe, kwargs):
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+
+        try:
+            return await loop.run_in_executor(executor, run, recipe, kwargs)
+        except BrokenProcessPool:
+            # a worker died, most likely killed for its memory, the pool can't be used again so it's replaced
+            # every job in flight on it ends up here, only the first replaces it so the retries aren't cancelled
+            if self.executor is executor:
+                self.restart()
+
+            return await loop.run_in_executor(self.executor, run, recipe, kwargs)
+
+    async def render_and_store(self, key, recipe, kwargs):
+        try:
+            data = await self.run(recipe, kwargs)
+            await self.cache.store(key, data)
+            return data
+        finally:
+            del self.pending[key]
+
+    async def render(self, recipe, **kwargs):
+        """Returns the rendered png in a buffer ready to be sent"""
+
+        key = self.cache.key(recipe, kwargs, self.version)
+        data = await self.cache.load(key)
+
+        if data is None:
+            task = self.pending.get(key)
+
+            if task is None:
+                task = self.pending[key] = asyncio.create_task(self.render_and_store(key, recipe, kwargs))
+
+            # a cancelled command doesn't cancel the render others are waiting on
+            data = await asyncio.shield(task)
+
+        # every send reads its own buffer
+        return BytesIO(data)
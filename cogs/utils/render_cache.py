@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import os
+
+from collections import OrderedDict
+from contextlib import suppress
+from tempfile import NamedTemporaryFile
+
+import loadconfig
+
+# bytes of rendered pngs kept in memory, optional in loadconfig
+RENDER_CACHE_SIZE = getattr(loadconfig, "__render_cache_size__", 32 * 1024 * 1024)
+# renders evicted from memory are written here when it's set
+RENDER_CACHE_DIR = getattr(loadconfig, "__render_cache_dir__", None)
+RENDER_CACHE_DISK_SIZE = getattr(loadconfig, "__render_cache_disk_size__", 256 * 1024 * 1024)
+
+
+def asset_version(paths):
+    """Changes whenever one of the files a render depends on changes"""
+
+    digest = hashlib.sha256()
+
+    for path in sorted(paths):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+
+        digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+
+    return digest.hexdigest()[:16]
+
+
+class RenderCache:
+    """
+    Rendered pngs keyed on a hash of the recipe, its arguments and the asset version
+    least recently used renders past the byte budget are evicted, to the spill directory when there is one
+    """
+
+    def __init__(self, budget=RENDER_CACHE_SIZE, directory=RENDER_CACHE_DIR, disk_budget=RENDER_CACHE_DISK_SIZE):
+        self.budget = budget
+        self.size = 0
+        self._renders = OrderedDict()
+        self.directory = directory
+        self.disk_budget = disk_budget
+        self.disk_size = 0
+        # key -> size of the spilled file, oldest first
+        self._spilled = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.scan()
+
+    def __len__(self):
+        return len(self._renders)
+
+    @staticmethod
+    def key(recipe, kwargs, version):
+        # the arguments are already normalized by the commands, a repr of them is stable for the same input
+        arguments = repr((recipe, sorted(kwargs.items()), version))
+        return hashlib.sha256(arguments.encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.png")
+
+    def scan(self):
+        # files left from before a restart, a changed asset version means they're never hit and age out
+        files = []
+
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".png"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+
+        for _, key, size in sorted(files):
+            self._spilled[key] = size
+            self.disk_size += size
+
+    def read(self, key):
+        with open(self.path(key), "rb") as file:
+            return file.read()
+
+    def write(self, renders):
+        for key, data in renders:
+            # written to a temporary file first so a crash never leaves half a png under the key
+            with NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False) as file:
+                file.write(data)
+
+            os.replace(file.name, self.path(key))
+
+    def remove(self, keys):
+        for key in keys:
+            with suppress(OSError):
+                os.remove(self.path(key))
+
+    def get(self, key):
+        data = self._renders.get(key)
+
+        if data is not None:
+            self._renders.move_to_end(key)
+
+        return data
+
+    def set(self, key, data):
+        """Returns the renders evicted to stay in the budget"""
+
+        if key in self._renders:
+            self.size -= len(self._renders.pop(key))
+
+        self._renders[key] = data
+        self.size += len(data)
+
+        evicted = []
+        while self.size > self.budget and len(self._renders) > 1:
+            old_key, old_data = self._renders.popitem(last=False)
+            self.size -= len(old_data)
+            evicted.append((old_key, old_data))
+
+        return evicted
+
+    async def load(self, key):
+        data = self.get(key)
+
+        if data is not None:
+            self.hits += 1
+            return data
+
+        if key in self._spilled:
+            loop = asyncio.get_running_loop()
+
+            try:
+                data = await loop.run_in_executor(None, self.read, key)
+            except OSError:
+                self.disk_size -= self._spilled.pop(key, 0)
+            else:
+                self.disk_hits += 1
+                await self.store(key, data)
+                return data
+
+        self.misses += 1
+        return None
+
+    async def store(self, key, data):
+        evicted = self.set(key, data)
+
+        if not evicted or not self.directory:
+            return
+
+        spill = []
+        for old_key, old_data in evicted:
+            if old_key in self._spilled:
+                # the same render was spilled before, the file is still there
+                self._spilled.move_to_end(old_key)
+                continue
+
+            self._spilled[old_key] = len(old_data)
+            self.disk_size += len(old_data)
+            spill.append((old_key, old_data))
+
+        removed = []
+        while self.disk_size > self.disk_budget and self._spilled:
+            old_key, size = self._spilled.popitem(last=False)
+            self.disk_size -= size
+            removed.append(old_key)
+
+        spill = [(old_key, old_data) for old_key, old_data in spill if old_key in self._spilled]
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.write, spill)
+
+        if removed:
+            await loop.run_in_executor(None, self.remove, removed)
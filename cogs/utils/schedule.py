@@ -0,0 +1,116 @@
+import asyncio
+import bisect
+import time
+
+from datetime import datetime as d
+
+import aiohttp
+from discord.ext import tasks
+
+from cogs.error_handler import RequestFailed
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def resolve_weekday(day):
+    """Full weekday name for a day or its abbreviation like mon or tues, None if it isn't one"""
+
+    day = day.lower()
+
+    for weekday in WEEKDAYS:
+        if day in (weekday, weekday[:3], weekday[:4]):
+            return weekday
+
+    return None
+
+
+class AiringSchedule:
+    """The next episode of every releasing anime, kept in memory and refreshed in the background"""
+
+    def __init__(self, ani_list_api, concurrency=4):
+        self.api = ani_list_api
+        # pages fetched at once, the bot's client still applies AniList's rate limit
+        self.semaphore = asyncio.Semaphore(concurrency)
+        # sorted by airing time
+        self.airing_at = []
+        self.media = []
+        # weekday -> media airing on that day in airing order
+        self.weekdays = {}
+        self.updated_at = None
+        self.refresh_loop.add_exception_type(RequestFailed, aiohttp.ClientError, asyncio.TimeoutError)
+
+    def start(self):
+        self.refresh_loop.start()
+
+    def stop(self):
+        self.refresh_loop.cancel()
+
+    async def fetch_page(self, page):
+        async with self.semaphore:
+            js = await self.api.schedule_search(str(page))
+
+        return js["data"]["Page"]
+
+    async def fetch_all(self):
+        first = await self.fetch_page(1)
+        pages = [first]
+        last_page = first["pageInfo"].get("lastPage") or 1
+
+        if last_page > 1:
+            pages.extend(await asyncio.gather(*(self.fetch_page(page) for page in range(2, last_page + 1))))
+
+        # lastPage is an estimate, anything past it is fetched one page at a time
+        page = last_page
+        while pages[-1]["pageInfo"]["hasNextPage"]:
+            page += 1
+            pages.append(await self.fetch_page(page))
+
+        return [media for p in pages for media in p["media"]]
+
+    def build(self, entries):
+        seen = set()
+        airing = []
+
+        for media in entries:
+            episode = media.get("nextAiringEpisode")
+
+            # media can move between pages while they're fetched and show up twice
+            if not episode or media["id"] in seen:
+                continue
+
+            seen.add(media["id"])
+            airing.append((episode["airingAt"], media))
+
+        airing.sort(key=lambda t: t[0])
+
+        weekdays = {weekday: [] for weekday in WEEKDAYS}
+        for timestamp, media in airing:
+            weekdays[d.fromtimestamp(timestamp).strftime("%A").lower()].append((timestamp, media))
+
+        # swapped in together so a command never sees half of a refresh
+        self.airing_at = [timestamp for timestamp, _ in airing]
+        self.media = [media for _, media in airing]
+        self.weekdays = weekdays
+        self.updated_at = d.now()
+
+    async def refresh(self):
+        self.build(await self.fetch_all())
+
+    @tasks.loop(hours=1)
+    async def refresh_loop(self):
+        await self.refresh()
+
+    @refresh_loop.before_loop
+    async def before_refresh(self):
+        # the bot's client is only set once it has logged in
+        await self.api.bot.wait_until_ready()
+
+    def upcoming(self, day=None):
+        """Media with an episode that hasn't aired yet, for a single weekday when one is given"""
+
+        now = time.time()
+
+        if day is None:
+            return self.media[bisect.bisect_right(self.airing_at, now):]
+
+        return [media for timestamp, media in self.weekdays.get(day, []) if timestamp > now]
@@ -0,0 +1,118 @@
+import asyncio
+
+from collections import namedtuple, OrderedDict
+from datetime import datetime as d
+
+import aiohttp
+from bs4 import BeautifulSoup
+from discord.ext import tasks
+
+from cogs.error_handler import RequestFailed
+
+SEASONS = ["WINTER", "SPRING", "SUMMER", "FALL"]
+
+# only what the seasonal embed shows, the synopsis is already stripped of its html
+ChartEntry = namedtuple("ChartEntry", "title english_title mal_id url episodes synopsis cover start_date end_date score")
+
+
+def normalize_season(season):
+    season = season.upper()
+    return "FALL" if season == "AUTUMN" else season
+
+
+def current_season(now=None):
+    now = now or d.now()
+    # december is already the winter season of the next year on anilist
+    year = now.year + 1 if now.month == 12 else now.year
+    return year, SEASONS[now.month % 12 // 3]
+
+
+def next_season(year, season):
+    index = SEASONS.index(season)
+
+    if index == len(SEASONS) - 1:
+        return year + 1, SEASONS[0]
+
+    return year, SEASONS[index + 1]
+
+
+def format_date(date):
+    return "/".join(str(x) for x in date.values() if x)
+
+
+def chart_entry(media):
+    return ChartEntry(media["title"]["romaji"], media["title"]["english"], media["idMal"], media["siteUrl"],
+                      media["episodes"], BeautifulSoup(media["description"] or "", "lxml").text,
+                      media["coverImage"]["medium"], format_date(media["startDate"]), format_date(media["endDate"]),
+                      media["averageScore"] or 0)
+
+
+class SeasonalCharts:
+    """Every page of a season's anime, the current and next season are fetched ahead of time"""
+
+    def __init__(self, ani_list_api, maxsize=8):
+        self.api = ani_list_api
+        self.maxsize = maxsize
+        # (year, season) -> tuple of ChartEntry, only complete charts are kept
+        self.charts = OrderedDict()
+        self.prewarm_loop.add_exception_type(RequestFailed, aiohttp.ClientError, asyncio.TimeoutError)
+
+    def start(self):
+        self.prewarm_loop.start()
+
+    def stop(self):
+        self.prewarm_loop.cancel()
+
+    def store(self, key, entries):
+        self.charts[key] = tuple(entries)
+        self.charts.move_to_end(key)
+
+        if len(self.charts) > self.maxsize:
+            self.charts.popitem(last=False)
+
+    async def stream(self, year, season):
+        """Yields the season's anime a page at a time, later pages are only fetched once they're reached"""
+
+        key = (year, normalize_season(season))
+        chart = self.charts.get(key)
+
+        if chart is not None:
+            for entry in chart:
+                yield entry
+
+            return
+
+        entries = []
+        page = 1
+
+        while True:
+            js = await self.api.seasonal_search(year, key[1], page)
+            media = [chart_entry(m) for m in js["data"]["Page"]["media"]]
+            entries.extend(media)
+
+            for entry in media:
+                yield entry
+
+            if not js["data"]["Page"]["pageInfo"]["hasNextPage"]:
+                break
+
+            page += 1
+
+        self.store(key, entries)
+
+    async def load(self, year, season):
+        self.charts.pop((year, normalize_season(season)), None)
+
+        async for _ in self.stream(year, season):
+            pass
+
+    @tasks.loop(hours=6)
+    async def prewarm_loop(self):
+        year, season = current_season()
+        await self.load(year, season)
+        await self.load(*next_season(year, season))
+
+    @prewarm_loop.before_loop
+    async def before_prewarm(self):
+        # the bot's client is only set once it has logged in
+        await self.api.bot.wait_until_ready()
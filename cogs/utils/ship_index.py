@@ -0,0 +1,152 @@
+import csv
+
+from collections import defaultdict
+
+from cogs.utils.ehp import ShipStats
+from config.utils.tag_index import TagIndex
+
+# thanks to @cyberFluff#9161
+GEAR_HUB_PATH = "config/Gear Guide Hub.csv"
+SHIP_STATS_PATH = "config/ShipStats120.csv"
+
+# columns of a Gear Guide Hub.csv row
+GUIDE_NAME, GUIDE_RARITY, GUIDE_HULL, GUIDE_URL = range(4)
+
+SHIP_STATS_FIELDS = ("# Lvl 120", "Name", "Hull", "HP", "EVA", "LUK", "Armor", "EVA Rate", "EVAS", "DMGR")
+
+
+def read_gear_hub(path=GEAR_HUB_PATH):
+    with open(path, "r") as file:
+        return list(csv.reader(file))
+
+
+def read_ship_stats(path=SHIP_STATS_PATH):
+    with open(path, "r") as file:
+        return list(csv.DictReader(file, fieldnames=SHIP_STATS_FIELDS))
+
+
+def write_gear_hub(file, rows):
+    csv.writer(file, delimiter=",", lineterminator="\n").writerows(rows)
+
+
+def write_ship_stats(file, rows):
+    csv.DictWriter(file, fieldnames=SHIP_STATS_FIELDS, lineterminator="\n").writerows(rows)
+
+
+def fold(name):
+    return name.strip().casefold()
+
+
+class ShipIndex:
+    """
+    The gear guide hub and ship stats rows keyed on case folded names with hull and rarity buckets
+    the row lists are kept as they are in the csv files and updated alongside the index so they can be written back
+    """
+
+    def __init__(self, gear_hub, stats_rows):
+        # the first row of the gear guide hub is its header
+        self.gear_hub = gear_hub
+        self.header = gear_hub[0]
+        self.stats_rows = stats_rows
+
+        self.guides = {}
+        self.hulls = defaultdict(list)
+        self.rarities = defaultdict(list)
+        self.stats = {}
+        # the same trigram matcher tags use for suggestions
+        self.names = TagIndex()
+
+        for row in gear_hub[1:]:
+            self.index_guide(row)
+
+        for row in stats_rows:
+            # the stats csv is read with its own field names so its header comes through as a row
+            if row["Name"] != "Name":
+                self.index_stats(row)
+
+        # parsed numbers of the stats rows
+        self.ship_stats = ShipStats(stats_rows)
+
+    @classmethod
+    def load(cls):
+        return cls(read_gear_hub(), read_ship_stats())
+
+    def index_guide(self, row):
+        self.guides[fold(row[GUIDE_NAME])] = row
+        self.hulls[fold(row[GUIDE_HULL])].append(row)
+        self.rarities[fold(row[GUIDE_RARITY])].append(row)
+        self.names.add(row[GUIDE_NAME])
+
+    def index_stats(self, row):
+        self.stats[fold(row["Name"])] = row
+        self.names.add(row["Name"])
+
+    def forget_name(self, name):
+        # a name stays suggested as long as it has a guide or stats
+        key = fold(name)
+
+        if key not in self.guides and key not in self.stats:
+            self.names.remove(name)
+
+    def guide(self, name):
+        return self.guides.get(fold(name))
+
+    def stats_row(self, name):
+        return self.stats.get(fold(name))
+
+    def stats_position(self, name):
+        """Position of the ship in ship_stats, None for a ship without stats or with stats that aren't numbers"""
+
+        row = self.stats_row(name)
+        return None if row is None else self.ship_stats.position(row)
+
+    def by_hull(self, hull):
+        return self.hulls.get(fold(hull), [])
+
+    def by_rarity(self, rarity):
+        return self.rarities.get(fold(rarity), [])
+
+    def canonical_name(self, name):
+        """The name as the wiki has it for ships with a guide, anything else is returned as is"""
+
+        row = self.guide(name)
+
+        if row is None:
+            return name
+
+        return row[GUIDE_NAME].replace("kai", "Kai")
+
+    def suggestions(self, name, limit=3):
+        return self.names.similar(name, limit)
+
+    def add_guide(self, row):
+        self.gear_hub.append(row)
+        self.index_guide(row)
+
+    def remove_guide(self, name):
+        row = self.guides.pop(fold(name), None)
+
+        if row is None:
+            return None
+
+        self.gear_hub.remove(row)
+        self.hulls[fold(row[GUIDE_HULL])].remove(row)
+        self.rarities[fold(row[GUIDE_RARITY])].remove(row)
+        self.forget_name(row[GUIDE_NAME])
+        return row
+
+    def add_stats(self, row):
+        self.stats_rows.append(row)
+        self.index_stats(row)
+        self.ship_stats = ShipStats(self.stats_rows)
+
+    def remove_stats(self, name):
+        row = self.stats.pop(fold(name), None)
+
+        if row is None:
+            return None
+
+        self.stats_rows.remove(row)
+        self.forget_name(row["Name"])
+        self.ship_stats = ShipStats(self.stats_rows)
+        return row
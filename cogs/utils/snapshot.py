@@ -0,0 +1,92 @@
+import asyncio
+import os
+
+from tempfile import NamedTemporaryFile
+
+
+class SnapshotWriter:
+    """
+    Writes a file off the event loop, every edit made within delay seconds of the first goes in a single write
+    the file is replaced in one step so it's never seen half written
+    """
+
+    def __init__(self, path, snapshot, write, delay=5.0):
+        self.path = path
+        # called on the loop to copy what's written, so edits made during the write aren't seen half done
+        self.snapshot = snapshot
+        # writes the snapshot to an open file
+        self.write = write
+        self.delay = delay
+        self.dirty = False
+        self.lock = asyncio.Lock()
+        self.task = None
+        # set by close so a write waiting out its delay goes now
+        self.wake = asyncio.Event()
+        self.edits = 0
+        self.writes = 0
+
+    def schedule(self):
+        self.dirty = True
+        self.edits += 1
+
+        if self.task is None or self.task.done():
+            self.wake.clear()
+            self.task = asyncio.create_task(self.write_later())
+
+    async def write_later(self):
+        try:
+            await asyncio.wait_for(self.wake.wait(), self.delay)
+        except asyncio.TimeoutError:
+            pass
+
+        await self.flush()
+
+    def replace(self, data):
+        # the temporary file is in the same directory so the rename can't cross filesystems
+        directory = os.path.dirname(os.path.abspath(self.path))
+
+        file = NamedTemporaryFile(mode="w", dir=directory, suffix=".tmp", delete=False, newline="")
+
+        try:
+            with file:
+                self.write(file, data)
+                file.flush()
+                os.fsync(file.fileno())
+
+            os.replace(file.name, self.path)
+
+        except BaseException:
+            # nothing is left behind by a write or a rename that failed
+            os.unlink(file.name)
+            raise
+
+    async def flush(self):
+        async with self.lock:
+            if not self.dirty:
+                return
+
+            self.dirty = False
+            data = self.snapshot()
+
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.replace, data)
+            except Exception:
+                # written with the next edit or flush
+                self.dirty = True
+                raise
+
+            self.writes += 1
+
+    async def close(self):
+        # the pending write is woken and waited on rather than cancelled, a cancel could return before the
+        # executor has replaced the file
+        self.wake.set()
+
+        if self.task is not None:
+            try:
+                await self.task
+            except Exception:
+                # still dirty, tried again below
+                pass
+
+        await self.flush()
@@ -0,0 +1,133 @@
+import math
+
+from PIL import Image, ImageDraw
+
+
+# lines measured per font before the oldest ones are forgotten, command text rarely repeats past the templates
+MAX_CACHED_LINES = 512
+
+
+class FontMetrics:
+    """
+    Line height of a font and the advance and bounding box of every line drawn with it
+    lines are measured whole so the kerning and shaping draw.text applies is included
+    """
+
+    __slots__ = ("font", "ascent", "descent", "line_height", "lines")
+
+    def __init__(self, font):
+        self.font = font
+        self.ascent, self.descent = font.getmetrics()
+        self.line_height = self.ascent + self.descent
+        # line -> (advance, (left, top, right, bottom))
+        self.lines = {}
+
+    def measure(self, line):
+        measured = self.lines.get(line)
+
+        if measured is None:
+            if len(self.lines) >= MAX_CACHED_LINES:
+                # insertion ordered, the oldest line goes first
+                del self.lines[next(iter(self.lines))]
+
+            measured = self.lines[line] = (self.font.getlength(line), self.font.getbbox(line))
+
+        return measured
+
+    def line_width(self, line):
+        return self.measure(line)[0]
+
+    def line_bbox(self, line):
+        """The box the line's pixels cover relative to where it's drawn, the left can be negative"""
+        return self.measure(line)[1]
+
+
+# fonts come from the asset cache and live as long as the worker, so their metrics do too
+_metrics = {}
+
+
+def metrics(font):
+    font_metrics = _metrics.get(font)
+
+    if font_metrics is None:
+        font_metrics = _metrics[font] = FontMetrics(font)
+
+    return font_metrics
+
+
+def split_lines(text):
+    # a list is already wrapped into lines
+    return [text] if isinstance(text, str) else list(text)
+
+
+def layout(font, text, vertical=False):
+    """
+    Positions every line of text relative to the first one and the size of the box they fill
+    vertical stacks the lines from the top, otherwise they follow each other on a single row
+    """
+
+    font_metrics = metrics(font)
+    lines = split_lines(text)
+    positions = []
+    x = y = 0
+    width = 0
+
+    for line in lines:
+        line_width = font_metrics.line_width(line)
+        positions.append(((x, y), line))
+
+        if vertical:
+            width = max(width, line_width)
+            y += font_metrics.line_height
+
+        else:
+            x += line_width
+            width = x
+
+    height = y if vertical else font_metrics.line_height
+    return positions, (math.ceil(width), height)
+
+
+def draw_text(draw, font, fill, text, xy, vertical=False):
+    """A draw call for every line rather than every character"""
+
+    positions, _ = layout(font, text, vertical)
+    x, y = xy
+
+    for (offset_x, offset_y), line in positions:
+        draw.text((x + offset_x, y + offset_y), line, font=font, fill=fill)
+
+
+def text_bbox(font, positions):
+    """The box every positioned line covers, it always holds the origin so the text lines up as it's laid out"""
+
+    font_metrics = metrics(font)
+    left = top = right = bottom = 0
+
+    for (x, y), line in positions:
+        line_left, line_top, line_right, line_bottom = font_metrics.line_bbox(line)
+        left, top = min(left, x + line_left), min(top, y + line_top)
+        right, bottom = max(right, x + line_right), max(bottom, y + line_bottom)
+
+    return left, top, right, bottom
+
+
+def render_text(font, fill, text, vertical=False, rotate=0):
+    """Text on a transparent image just big enough to fit it, rotated counter clockwise by rotate degrees"""
+
+    positions, (width, height) = layout(font, text, vertical)
+    left, top, right, bottom = text_bbox(font, positions)
+    # glyphs hanging past the laid out box like a negative left bearing still get drawn
+    size = (max(math.ceil(max(right, width) - left), 1), max(math.ceil(max(bottom, height) - top), 1))
+    image = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+
+    for (x, y), line in positions:
+        draw.text((x - left, y - top), line, font=font, fill=fill)
+
+    if not rotate:
+        return image
+
+    rotated = image.rotate(rotate, resample=Image.BICUBIC, expand=True)
+    image.close()
+    return rotated
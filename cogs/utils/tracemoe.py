@@ -1,6 +1,4 @@
-import asyncio
-
-from discord.ext import tasks
+import time
 
 from cogs.error_handler import RequestFailed
 
@@ -10,52 +8,56 @@ BASE_MEDIA_URL = "https://media.trace.moe/"
 VIDEO_PREVIEW = "preview.php"
 IMAGE_PREVIEW = "thumbnail.php"
 
+# seconds before the quota is checked with the api again, searches in between are counted locally
+QUOTA_REFRESH = 300
+
 
 class TraceMoeApi:
-    def __init__(self, ctx, api_token=""):
-        self.session = ctx.bot.session
+    """One instance is shared by the cog, requests are queued by the bot's client for api.trace.moe"""
+
+    def __init__(self, bot, api_token=""):
+        # the bot's request is only set once it has logged in
+        self.bot = bot
         self.api_token = api_token
-        self.lock = asyncio.Lock()
-        self.unlocked = asyncio.Event()
-        self.set_lock.start()
-
-    @tasks.loop(seconds=1)
-    async def set_lock(self):
-        if self.lock.locked() is False:
-            self.unlocked.set()
-        else:
-            self.unlocked.clear()
+        self.quota = None
+        self.quota_used = None
+        self.quota_checked = 0.0
 
-    async def get(self, url, params=None):
+    @property
+    def quota_left(self):
+        if self.quota is None:
+            return None
 
-        await self.unlocked.wait()
+        return max(self.quota - self.quota_used, 0)
 
-        async with self.lock:
-            if params:
-                return await self.session.get(url, params=params)
-            return await self.session.get(url)
+    async def get(self, url, params=None):
+        # one search at a time is allowed, the bot's client limits api.trace.moe to that
+        return await self.bot.request.request("GET", url, params=params)
 
-    async def quota_reached(self):
+    async def refresh_quota(self):
 
         url = BASE_URL + "/me"
         params = {}
         if self.api_token:
             params["key"] = self.api_token
 
-        response = await self.get(url)
+        response = await self.get(url, params=params)
 
         if response.status == 403:
             raise RequestFailed("Invalid api token.")
 
-        js = await response.json()
+        js = response.content
+
+        self.quota = js["quota"]
+        self.quota_used = js["quotaUsed"]
+        self.quota_checked = time.monotonic()
 
-        used = js["quotaUsed"]
-        quota = js["quota"]
-        left = quota - used
+    async def quota_reached(self):
 
-        print(f"Quota: {quota}\nQuota used: {used}\nQuota left: {left}")
+        if self.quota is None or time.monotonic() - self.quota_checked > QUOTA_REFRESH:
+            await self.refresh_quota()
 
-        return js["quotaUsed"] == js["quota"]
+        return self.quota_used >= self.quota
 
     async def search(self, path, **kwargs):
 
@@ -74,8 +76,15 @@ class TraceMoeApi:
         response = await self.get(url, params=params)
 
         if response.status == 200:
-            json = await response.json()
-            return json
+            if self.quota is not None:
+                self.quota_used += 1
+
+            return response.content
+
+        elif response.status == 402:
+            # out of quota, or too many searches at once for the key's concurrency
+            self.quota_checked = 0.0
+            raise RequestFailed("Bot's tracemoe quota or concurrency limit has been reached, try again later.")
 
         elif response.status == 400:
             raise RequestFailed("Image provided was empty!")
@@ -87,6 +96,6 @@ class TraceMoeApi:
             raise RequestFailed("Image is malformed or something went wrong")
 
         elif response.status == 429:
-            raise RequestFailed(response.text)
+            raise RequestFailed(f"Rate limited by trace.moe `{response.reason}`.")
         else:
-            raise RequestFailed(f"Unknown error: {response.status}, {response.url}")
+            raise RequestFailed(f"Unknown error: {response.status}, {url}")
@@ -33,21 +33,24 @@ class FishBuyView(discord.ui.View):
             self.add_item(btn)
 
     async def buy_all(self, bait_id: BaitConverter):
-        balance = await self.ctx.db.fetchval("select credits from users where user_id = $1", self.ctx.author.id)
-
         bait = await self.ctx.db.fetchrow("SELECT * FROM fish_bait WHERE bait_id = $1", bait_id)
         bait_price = bait["price"]
-        amount = balance // bait_price
 
-        if amount == 0:
-            return await self.ctx.send("You don't have enough money to buy any bait.")
+        async with self.ctx.transaction() as con:
+            # locked so a transfer or another purchase can't spend the same credits
+            balance = await con.fetchval("SELECT credits FROM users WHERE user_id = $1 FOR UPDATE",
+                                         self.ctx.author.id)
+            amount = balance // bait_price
 
-        async with self.ctx.db.transaction():
-            await self.ctx.db.execute("UPDATE users SET credits = credits - $1 WHERE user_id = $2", bait_price * amount,
-                                      self.ctx.author.id)
+            if amount > 0:
+                await con.execute("UPDATE users SET credits = credits - $1 WHERE user_id = $2", bait_price * amount,
+                                  self.ctx.author.id)
 
-            await self.ctx.db.execute("""UPDATE fish_user_inventory SET amount = amount + $1 
-                                         WHERE user_id = $2 AND bait_id = $3""", amount, self.ctx.author.id, bait_id)
+                await con.execute("""UPDATE fish_user_inventory SET amount = amount + $1 
+                                     WHERE user_id = $2 AND bait_id = $3""", amount, self.ctx.author.id, bait_id)
+
+        if amount == 0:
+            return await self.ctx.send("You don't have enough money to buy any bait.")
 
         await self.ctx.send(f"You bought {amount} {bait['bait_emote']} for {bait_price * amount} credits.")
 
@@ -155,8 +158,9 @@ class BuyButton(discord.ui.Button):
     async def update_credits(self, conn: asyncpg.pool.PoolConnectionProxy, cost, user_id):
         await conn.execute("UPDATE users SET credits = credits - $1 WHERE user_id = $2", cost, user_id)
 
-    async def get_credits(self, user_id):
-        return await self.ctx.db.fetchval("SELECT credits FROM users WHERE user_id = $1", user_id)
+    async def get_credits(self, conn: asyncpg.pool.PoolConnectionProxy, user_id):
+        # locks the row until the transaction ends
+        return await conn.fetchval("SELECT credits FROM users WHERE user_id = $1 FOR UPDATE", user_id)
 
     async def get_cost(self, amount, bait_id):
         bait = await self.ctx.db.fetchrow("SELECT * FROM fish_bait WHERE bait_id = $1", bait_id)
@@ -174,23 +178,26 @@ class BuyButton(discord.ui.Button):
 
         cost = await self.get_cost(amount, bait_id)
 
-        current_balance = await self.get_credits(user_id)
-
-        if cost > current_balance or current_balance - cost < 0:
-            return await interaction.followup.send(
-                ":no_entry: | you do not have enough credits for this transaction.", ephemeral=True)
-
+        # a connection of its own for just the purchase, nothing is held while the modal is open
         async with self.ctx.bot.pool.acquire() as con:
             async with con.transaction():
-                await self.update_credits(con, cost, user_id)
+                current_balance = await self.get_credits(con, user_id)
+                enough = current_balance is not None and current_balance - cost >= 0
 
-                await InventoryView.update_inventory(con, user_id, bait_id, amount, emoji)
+                if enough:
+                    await self.update_credits(con, cost, user_id)
+
+                    await InventoryView.update_inventory(con, user_id, bait_id, amount, emoji)
+
+        if not enough:
+            return await interaction.followup.send(
+                ":no_entry: | you do not have enough credits for this transaction.", ephemeral=True)
 
-                await interaction.followup.send(f":information_source: | "
-                                                f"{cost} credits has been deducted from your account, "
-                                                f"{self.ctx.author.name} you bought some {emoji} "
-                                                f"`to use your bait click the use button.",
-                                                ephemeral=True)
+        await interaction.followup.send(f":information_source: | "
+                                        f"{cost} credits has been deducted from your account, "
+                                        f"{self.ctx.author.name} you bought some {emoji} "
+                                        f"`to use your bait click the use button.",
+                                        ephemeral=True)
 
     async def callback(self, interaction: discord.Interaction):
         assert self.view is not None
@@ -230,38 +237,36 @@ class FishSellDupes(discord.ui.Button):
 
         excluded_fish_ids = await view.get_fish_favourites(self.ctx)
 
-        data = await self.ctx.db.fetch("""SELECT DISTINCT 
-                                          fuc.amount, fish.rarity_id, fuc.fish_id
-                                          from fish_users_catches as fuc
-                                          INNER JOIN fish ON fuc.fish_id = 
-                                          fish.fish_id 
-                                          WHERE user_id = $1 and NOT (fish.fish_id  = ANY ($2)) 
-                                          GROUP BY fish.rarity_id, 
-                                          fuc.amount, 
-                                          fuc.fish_id""", self.ctx.author.id, excluded_fish_ids)
-        if data == []:
-            return await interaction.response.send_message(":no_entry: | you currently have no fish caught.")
+        async with self.ctx.bot.pool.acquire() as con:
+            async with con.transaction():
+                # the catches are locked so fish caught in between aren't reset without being paid for
+                data = await con.fetch("""SELECT fuc.amount, fish.rarity_id, fuc.fish_id
+                                          FROM fish_users_catches as fuc
+                                          INNER JOIN fish ON fuc.fish_id = fish.fish_id 
+                                          WHERE user_id = $1 and NOT (fish.fish_id  = ANY ($2))
+                                          FOR UPDATE OF fuc""", self.ctx.author.id, excluded_fish_ids)
 
-        # too lazy to rewrite this
-        # to not set a fish to zero
-        amount_list = [d["amount"] - 1 for d in data if d["amount"] - 1 > 0]
-        rarity_list = [d["rarity_id"] for d in data if d["amount"] - 1 > 0]
-        data = [{"rarity_id": x, "sum": amount_list[i]} for i, x in enumerate(rarity_list)]
+                # too lazy to rewrite this
+                # to not set a fish to zero
+                amount_list = [d["amount"] - 1 for d in data if d["amount"] - 1 > 0]
+                rarity_list = [d["rarity_id"] for d in data if d["amount"] - 1 > 0]
+                dupes = [{"rarity_id": x, "sum": amount_list[i]} for i, x in enumerate(rarity_list)]
 
-        amount = self.view.price_sum_setter(data)
+                amount = self.view.price_sum_setter(dupes)
 
-        if amount == 0:
-            return await interaction.response.send_message(":no_entry: | you have no duplicate fish.")
+                if amount != 0:
+                    await con.execute("""UPDATE fish_users_catches SET amount = 1 WHERE user_id = $1 
+                                         and NOT (fish_id  = ANY ($2))""",
+                                      self.ctx.author.id, excluded_fish_ids)
 
-        async with self.ctx.bot.pool.acquire() as con:
-            async with con.transaction():
-                await con.execute("""UPDATE fish_users_catches SET amount = 1 from fish where 
-                                             fish_users_catches.user_id = $1 
-                                             and NOT (fish_users_catches.fish_id  = ANY ($2))""",
-                                  self.ctx.author.id, excluded_fish_ids)
+                    await con.execute("""UPDATE users SET credits = credits + $1 where user_id = $2 """,
+                                      amount, self.ctx.author.id)
 
-                await con.execute("""UPDATE users SET credits = credits + $1 where user_id = $2 """,
-                                  amount, self.ctx.author.id)
+        if data == []:
+            return await interaction.response.send_message(":no_entry: | you currently have no fish caught.")
+
+        if amount == 0:
+            return await interaction.response.send_message(":no_entry: | you have no duplicate fish.")
 
         await interaction.response.send_message(
             f":information_source: | successfully sold all dupe fish, {self.ctx.author.name} you gained {amount} credits.")
@@ -301,40 +306,36 @@ class FishSellRarity(discord.ui.Button):
 
         async with self.ctx.bot.pool.acquire() as con:
             async with con.transaction():
+                # paid for what was actually deleted, not a count taken before the delete
+                deleted = await con.fetch("""DELETE FROM fish_users_catches
+                                             USING fish WHERE fish_users_catches.fish_id = fish.fish_id 
+                                             AND rarity_id = $1 AND user_id = $2
+                                             AND NOT (fish.fish_id  = ANY ($3)) RETURNING fish_users_catches.amount""",
+                                          rarity_id, self.ctx.author.id, excluded_fish_ids)
 
-                amount = await con.fetchval("""SELECT DISTINCT SUM(fish_users_catches.amount) 
-                                                  FROM fish_users_catches 
-                                                  INNER JOIN fish ON fish_users_catches.fish_id = fish.fish_id 
-                                                  WHERE user_id = $1 AND rarity_id = $2 
-                                                  AND NOT (fish.fish_id = ANY ($3))""",
-                                            self.ctx.author.id, rarity_id, excluded_fish_ids)
-
-                if amount == 0 or amount is None:
-                    return await interaction.followup.send(":no_entry: | you have no fish of this rarity.",
-                                                           ephemeral=True)
+                amount = sum(row["amount"] for row in deleted)
 
-                amount = self.view.price_setter(rarity_id, amount)
+                if amount != 0:
+                    amount = self.view.price_setter(rarity_id, amount)
 
-                data = await con.fetch("""DELETE FROM fish_users_catches
-                                          USING fish WHERE fish_users_catches.fish_id = fish.fish_id 
-                                          AND rarity_id = $1 AND user_id = $2
-                                          AND NOT (fish.fish_id  = ANY ($3)) RETURNING *""",
-                                       rarity_id, self.ctx.author.id, excluded_fish_ids)
+                    await con.execute("""UPDATE users SET credits = credits + $1 where user_id = $2 """,
+                                      amount, self.ctx.author.id)
 
                 rarity = await con.fetchval("SELECT rarity_name FROM fish_rarity WHERE rarity_id = $1", rarity_id)
 
-                if excluded_fish_ids:
-                    await interaction.followup.send(
-                        f"> Sold all {rarity} fish with excluded fish ids {','.join(str(x) for x in excluded_fish_ids)} "
-                        f"{self.ctx.author.name}.",
-                        ephemeral=True)
+        if amount == 0:
+            return await interaction.followup.send(":no_entry: | you have no fish of this rarity.",
+                                                   ephemeral=True)
 
-                await con.execute("""UPDATE users SET credits = credits + $1 where user_id = $2 """,
-                                  amount, self.ctx.author.id)
+        if excluded_fish_ids:
+            await interaction.followup.send(
+                f"> Sold all {rarity} fish with excluded fish ids {','.join(str(x) for x in excluded_fish_ids)} "
+                f"{self.ctx.author.name}.",
+                ephemeral=True)
 
-                await interaction.followup.send(f"Successfully sold all fish of rarity {rarity} "
-                                                f"{self.ctx.author.name} "
-                                                f"you gained {amount} credits.", ephemeral=True)
+        await interaction.followup.send(f"Successfully sold all fish of rarity {rarity} "
+                                        f"{self.ctx.author.name} "
+                                        f"you gained {amount} credits.", ephemeral=True)
 
 
 class FishSellButton(discord.ui.Button):
@@ -355,11 +356,32 @@ class FishSellButton(discord.ui.Button):
                 ":no_entry: | you currently have this fish registered as a favourite fish",
                 ephemeral=True)
 
-        data = await self.ctx.db.fetchrow("""SELECT amount, fish.rarity_id, fish.fish_name FROM fish_users_catches
-                                                INNER JOIN fish ON fish_users_catches.fish_id = fish.fish_id 
-                                                WHERE user_id = $1 AND fish_users_catches.fish_id = $2""",
+        async with self.ctx.bot.pool.acquire() as con:
+            async with con.transaction():
+                # checked with the row locked, the modal may have been open for a while
+                data = await con.fetchrow("""SELECT amount, fish.rarity_id, fish.fish_name FROM fish_users_catches
+                                             INNER JOIN fish ON fish_users_catches.fish_id = fish.fish_id 
+                                             WHERE user_id = $1 AND fish_users_catches.fish_id = $2
+                                             FOR UPDATE OF fish_users_catches""",
                                           self.ctx.author.id,
                                           fish_id)
+
+                if data and data["amount"] >= amount:
+                    pay_out = view.price_setter(data["rarity_id"], amount)
+
+                    if data["amount"] == amount:
+                        await con.execute("""DELETE FROM fish_users_catches
+                                             WHERE fish_id = $1 and user_id = $2""",
+                                          fish_id, self.ctx.author.id)
+
+                    else:
+                        await con.execute("""UPDATE fish_users_catches SET amount = amount - $3
+                                             WHERE fish_id = $1 and user_id = $2""",
+                                          fish_id, self.ctx.author.id, amount)
+
+                    await con.execute("""UPDATE users SET credits = credits + $1 where user_id = $2 """,
+                                      pay_out, self.ctx.author.id)
+
         if not data:
             return await interaction.followup.send(":no_entry: | you currently don't own that fish.",
                                                    ephemeral=True)
@@ -368,29 +390,10 @@ class FishSellButton(discord.ui.Button):
             return await interaction.followup.send(
                 f":no_entry: | you do not have enough {data['fish_name']} for this action")
 
-        rarity_id = data["rarity_id"]
-        pay_out = view.price_setter(rarity_id, amount)
-
-        delete_check = data["amount"] == amount
-
-        async with self.ctx.bot.pool.acquire() as con:
-            async with con.transaction():
-
-                if delete_check:
-                    await con.execute("""DELETE FROM fish_users_catches
-                                                         WHERE fish_id = $1 and user_id = $2""",
-                                      fish_id, self.ctx.author.id)
-
-                else:
-                    await con.execute("""UPDATE fish_users_catches SET amount = amount - $3
-                                                    WHERE fish_id = $1 and user_id = $2
-                                                      """,
-                                      fish_id, self.ctx.author.id, amount)
-
-                await interaction.followup.send(
-                    f"Successfully sold {amount} {data['fish_name']} {self.ctx.author.name} "
-                    f"you gained {pay_out} credits.",
-                    ephemeral=True)
+        await interaction.followup.send(
+            f"Successfully sold {amount} {data['fish_name']} {self.ctx.author.name} "
+            f"you gained {pay_out} credits.",
+            ephemeral=True)
 
 
 class UseButton(discord.ui.Button):
@@ -401,9 +404,10 @@ class UseButton(discord.ui.Button):
         self.emoji = PLATWAA
         self.style = discord.ButtonStyle.success
 
-    async def get_data(self, user_id: int, bait_id: int):
-        return await self.ctx.db.fetchrow(
-            "SELECT amount, bait_id FROM fish_user_inventory WHERE user_id = $1 AND bait_id = $2",
+    async def get_data(self, con: asyncpg.pool.PoolConnectionProxy, user_id: int, bait_id: int):
+        # locks the row until the transaction ends
+        return await con.fetchrow(
+            "SELECT amount, bait_id FROM fish_user_inventory WHERE user_id = $1 AND bait_id = $2 FOR UPDATE",
             user_id, bait_id)
 
     def validate_data(self, data, amount) -> bool:
@@ -422,17 +426,20 @@ class UseButton(discord.ui.Button):
         amount, bait_id = await view.get_modal_data(interaction)
         emoji = await view.get_bait_emoji(self.ctx.db, bait_id)
 
-        data = await self.get_data(self.ctx.author.id, bait_id)
-        check = self.validate_data(data, amount)
+        async with self.ctx.bot.pool.acquire() as con:
+            async with con.transaction():
+                data = await self.get_data(con, self.ctx.author.id, bait_id)
+                check = self.validate_data(data, amount)
+
+                if check:
+                    await InventoryView.expend_bait(con, amount, self.ctx.author.id, bait_id)
 
         if not check:
             return await interaction.followup.send(f":no_entry: | you do not have enough {emoji} for this action.",
                                                    ephemeral=True)
 
-        async with self.ctx.bot.pool.acquire() as con:
-            async with con.transaction():
-                await InventoryView.expend_bait(con, amount, self.ctx.author.id, bait_id)
-                f = fish.Fishing(self.ctx)
-                await f.catch_fish(self.ctx, bait_id, amount)
-                await f.display_fish()
-                await view.run()
+        # the bait is already spent, the catch and its menu don't need to hold the connection
+        f = fish.Fishing(self.ctx)
+        await f.catch_fish(self.ctx, bait_id, amount)
+        await f.display_fish()
+        await view.run()
@@ -0,0 +1,114 @@
+WIKI_API_URL = "https://azurlane.koumakan.jp/w/api.php"
+
+# seconds a response is cached for by the kind of query, the bot's client revalidates them once they expire
+QUERY_TTLS = {
+    # uploaded files hardly ever change
+    "images": 24 * 60 * 60,
+    "pages": 6 * 60 * 60,
+    "categories": 6 * 60 * 60,
+    "search": 60 * 60,
+}
+
+# the most titles the api takes in a single request
+MAX_TITLES = 50
+
+
+def chunks(items, size=MAX_TITLES):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class AzurLaneWiki:
+    """Cached queries to the azur lane wiki's api, titles are looked up many to a request"""
+
+    def __init__(self, bot):
+        # the bot's request is only set once it has logged in
+        self.bot = bot
+
+    async def query(self, params, kind="pages"):
+        params = {"action": "query", "format": "json", "formatversion": "2", **params}
+        return await self.bot.request.fetch(WIKI_API_URL, params=params, ttl=QUERY_TTLS[kind])
+
+    async def iter_query(self, params, kind="pages"):
+        """Yields every page of a query's results, following the continue token the api sends with each one"""
+
+        params = dict(params)
+
+        while True:
+            js = await self.query(params, kind)
+            yield js
+
+            if "continue" not in js:
+                return
+
+            params.update(js["continue"])
+
+    async def pages(self, titles, **params):
+        """Yields every page for the titles, MAX_TITLES at a time"""
+
+        for chunk in chunks(list(titles)):
+            async for js in self.iter_query({"titles": "|".join(chunk), **params}):
+                for page in js["query"].get("pages", []):
+                    yield page
+
+    async def revisions(self, titles):
+        """Yields the title and content of each page's current revision"""
+
+        async for page in self.pages(titles, prop="revisions", rvprop="content", rvslots="main"):
+            if "revisions" in page:
+                yield page["title"], page["revisions"][0]["slots"]["main"]["content"]
+
+    async def file_urls(self, file_names):
+        """The url of every file that exists, keyed by the name it was asked for"""
+
+        names = list(file_names)
+        urls = {}
+
+        for chunk in chunks(names):
+            titles = [f"File:{name}" for name in chunk]
+            js = await self.query({"titles": "|".join(titles), "prop": "imageinfo", "iiprop": "url"}, "images")
+            query = js["query"]
+
+            # underscores and the first letter are normalized by the wiki, mapped back to the asked for name
+            normalized = {n["to"]: n["from"] for n in query.get("normalized", [])}
+
+            for page in query.get("pages", []):
+                if page.get("missing") or "imageinfo" not in page:
+                    continue
+
+                title = normalized.get(page["title"], page["title"])
+                urls[title[len("File:"):]] = page["imageinfo"][0]["url"]
+
+        return urls
+
+    async def images(self, limit=None, **params):
+        """Yields every allimages result, a page of results is only requested once the previous one has been used"""
+
+        params = {"list": "allimages", "aisort": "name", **params}
+
+        if limit is not None:
+            params["ailimit"] = str(limit)
+
+        async for js in self.iter_query(params, "images"):
+            for image in js["query"]["allimages"]:
+                yield image
+
+    async def first_image(self, **params):
+        async for image in self.images(limit=1, **params):
+            return image
+
+        return None
+
+    async def page(self, title, prop="revisions|categories"):
+        js = await self.query({"titles": title, "prop": prop, "rvprop": "content", "rvslots": "main"})
+        return js["query"]["pages"][0]
+
+    async def category_members(self, category):
+        async for js in self.iter_query({"list": "categorymembers", "cmtitle": category, "cmlimit": "500"},
+                                        "categories"):
+            for member in js["query"]["categorymembers"]:
+                yield member
+
+    async def opensearch(self, search):
+        params = {"action": "opensearch", "search": search, "format": "json"}
+        return await self.bot.request.fetch(WIKI_API_URL, params=params, ttl=QUERY_TTLS["search"])
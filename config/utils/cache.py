@@ -1,10 +1,11 @@
 import asyncio
 import enum
+import time
+from collections import OrderedDict
 from functools import wraps
 
-from lru import LRU
-
-# pretty much taken from https://gist.github.com/dlebech/c16a34f735c0c4e9b604
+# originally based on https://gist.github.com/dlebech/c16a34f735c0c4e9b604
+# rewritten to share in-flight coroutines between callers and support expiry
 
 
 class Strategy(enum.Enum):
@@ -14,88 +15,203 @@ class Strategy(enum.Enum):
     raw = 2
 
 
-def _wrap_coroutine_storage(cache_dict, key, future):
+class CacheStats:
+    __slots__ = ("hits", "misses", "evictions", "expired", "loads", "load_errors", "load_time")
 
-    async def wrapper():
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self.loads = 0
+        self.load_errors = 0
+        self.load_time = 0.0
 
-        val = await future
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
 
-        cache_dict[key] = val
+    @property
+    def average_load_time(self):
+        return self.load_time / self.loads if self.loads else 0.0
 
-        return val
+    def as_dict(self):
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data["hit_rate"] = self.hit_rate
+        data["average_load_time"] = self.average_load_time
+        return data
 
-    return wrapper()
 
+class _Entry:
+    __slots__ = ("value", "expires_at")
 
-def _wrap_value_in_coroutine(val):
+    def __init__(self, value, expires_at=None):
+        self.value = value
+        self.expires_at = expires_at
 
-    async def wrapper():
+    def expired(self, now):
+        return self.expires_at is not None and now >= self.expires_at
 
-        return val
 
-    return wrapper()
+class _Storage:
+    """A dict of entries with optional lru eviction, expiry is checked lazily on access"""
 
+    def __init__(self, maxsize, strategy, stats):
+        self.maxsize = maxsize if strategy is Strategy.lru else None
+        self.stats = stats
+        self.entries = OrderedDict()
 
-def cache(maxsize=256, strategy=Strategy.lru):
-    def memoize(f):
-        if strategy is Strategy.lru:
-            __cache = LRU(maxsize)
-            __stats = __cache.items
+    def get(self, key):
+        entry = self.entries[key]
+
+        if entry.expired(time.monotonic()):
+            del self.entries[key]
+            self.stats.expired += 1
+            raise KeyError(key)
+
+        if self.maxsize:
+            self.entries.move_to_end(key)
+
+        return entry
+
+    def set(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+
+        while self.maxsize and len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def pop(self, key, entry=None):
+        # only remove the entry if it's still the one we expect, an invalidate may have replaced it
+        current = self.entries.get(key)
+        if current is None or (entry is not None and current is not entry):
+            return False
+
+        del self.entries[key]
+        return True
+
+    def clear(self):
+        self.entries.clear()
+
+    def items(self):
+        now = time.monotonic()
+        return [(k, e.value) for k, e in self.entries.items()
+                if not e.expired(now) and not isinstance(e.value, asyncio.Future)]
+
+
+def _expiry(ttl, value):
+    if callable(ttl):
+        ttl = ttl(value)
 
-        elif strategy is Strategy.raw:
-            __cache = {}
-            __stats = __cache.items
+    if ttl is None:
+        return None
+
+    return time.monotonic() + ttl
+
+
+def cache(maxsize=256, strategy=Strategy.lru, ttl=None):
+    """
+    Memoize a function or coroutine function
+    :param maxsize: The maximum amount of entries kept when using the lru strategy
+    :param strategy: lru to evict the least recently used entries or raw for an unbounded cache
+    :param ttl: Seconds an entry lives for, a callable taking the value can be passed for a per entry ttl
+    """
+
+    def memoize(f):
+        stats = CacheStats()
+        storage = _Storage(maxsize, strategy, stats)
 
         def make_key(*args, **kwargs):
             key = f"{f.__module__}#{f.__name__}#{repr((args, kwargs))}"
             return key
 
-        @wraps(f)
-        def wrapper(*args, **kwargs):
-
-            key = make_key(*args, **kwargs)
+        async def load(key, entry, *args, **kwargs):
+            start = time.perf_counter()
 
             try:
+                val = await f(*args, **kwargs)
 
-                val = __cache[make_key(*args, **kwargs)]
+            except BaseException:
+                # don't cache failures
+                stats.load_errors += 1
+                storage.pop(key, entry)
+                raise
 
-                if asyncio.iscoroutinefunction(f):
+            stats.loads += 1
+            stats.load_time += time.perf_counter() - start
 
-                    return _wrap_value_in_coroutine(val)
+            if storage.pop(key, entry):
+                storage.set(key, _Entry(val, _expiry(ttl, val)))
 
-                return val
+            return val
 
-            except KeyError:
+        async def wait_for(future):
+            # shielded so a cancelled caller doesn't cancel the load for everyone else waiting on it
+            return await asyncio.shield(future)
 
-                val = f(*args, **kwargs)
+        async def wrap_value(val):
+            return val
 
-                if asyncio.iscoroutine(val):
+        if asyncio.iscoroutinefunction(f):
 
-                    return _wrap_coroutine_storage(__cache, key, val)
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                key = make_key(*args, **kwargs)
 
-                __cache[key] = val
+                try:
+                    entry = storage.get(key)
 
-                return val
+                except KeyError:
+                    stats.misses += 1
+                    entry = _Entry(None)
+                    entry.value = asyncio.ensure_future(load(key, entry, *args, **kwargs))
+                    storage.set(key, entry)
+                    return wait_for(entry.value)
 
-        def __invalidate(*args, **kwargs):
-            key = make_key(*args, **kwargs)
+                stats.hits += 1
 
-            try:
+                if isinstance(entry.value, asyncio.Future):
+                    return wait_for(entry.value)
+
+                return wrap_value(entry.value)
 
-                del __cache[key]
+        else:
 
-            except KeyError:
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                key = make_key(*args, **kwargs)
 
-                return False
+                try:
+                    entry = storage.get(key)
 
-            else:
+                except KeyError:
+                    stats.misses += 1
+                    start = time.perf_counter()
+                    val = f(*args, **kwargs)
+                    stats.loads += 1
+                    stats.load_time += time.perf_counter() - start
+                    storage.set(key, _Entry(val, _expiry(ttl, val)))
+                    return val
 
-                return True
+                stats.hits += 1
+                return entry.value
+
+        def __invalidate(*args, **kwargs):
+            return storage.pop(make_key(*args, **kwargs))
 
         def __clear():
-            __cache.clear()
+            storage.clear()
+
+        def __get_stats():
+            data = stats.as_dict()
+            data["size"] = len(storage.entries)
+            data["maxsize"] = storage.maxsize
+            return data
 
-        wrapper.get_stats = __stats
+        wrapper.get_stats = __get_stats
+        wrapper.items = storage.items
         wrapper.invalidate = __invalidate
         wrapper.clear = __clear
         return wrapper
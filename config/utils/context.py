@@ -1,3 +1,6 @@
+import contextlib
+import time
+
 import discord
 from discord.ext import commands
 from config.utils.menu import BaseMenu, ReplyMenu, GlobalMenu, page_source
@@ -49,6 +52,7 @@ class Context(commands.Context):
         self.list_source = list_source
         self.pool = self.bot.pool
         self._db = None
+        self._acquired_at = None
         self.emote_unescape = self.bot.emote_unescape
         self.safe_everyone = self.bot.safe_everyone
         self.chunk = self.chunks
@@ -59,14 +63,27 @@ class Context(commands.Context):
         for i in range(0, len(l), n):
             yield l[i:i + n]
 
+    @property
+    def command_name(self):
+        return self.command.qualified_name if self.command else "no command"
+
+    async def wait_for(self, *args, **kwargs):
+        # waiting on a user while holding a connection keeps it from the rest of the pool,
+        # ctx.db falls back to the pool afterwards and ctx.transaction() gets a connection again
+        if self._db is not None:
+            await self.release()
+            self.bot.pool_stats.record_wait_release(self.command_name)
+
+        return await self.bot.wait_for(*args, **kwargs)
+
     async def wait_for_input(self, transaction_id, cancel_message):
 
-        message = await self.bot.wait_for('message', check=lambda message: message.author == self.author,
-                                          timeout=120)
+        message = await self.wait_for('message', check=lambda message: message.author == self.author,
+                                      timeout=120)
 
         while transaction_id not in message.content and "cancel" not in message.content.lower():
-            message = await self.bot.wait_for('message', check=lambda message: message.author == self.author,
-                                              timeout=120)
+            message = await self.wait_for('message', check=lambda message: message.author == self.author,
+                                          timeout=120)
 
         if message.content.lower() == "cancel":
             await self.send(cancel_message.format(self.author.name))
@@ -84,7 +101,10 @@ class Context(commands.Context):
     async def _acquire(self):
 
         if self._db is None:
+            start = time.perf_counter()
             self._db = await self.pool.acquire()
+            self._acquired_at = time.perf_counter()
+            self.bot.pool_stats.record_acquire(self.command_name, self._acquired_at - start)
 
         return self._db
 
@@ -92,9 +112,24 @@ class Context(commands.Context):
 
         return _ContextDBAcquire(self)
 
+    @contextlib.asynccontextmanager
+    async def transaction(self):
+        """A connection held only for the block in a transaction, released when it exits
+        so nothing is held while the command waits on a user again"""
+
+        con = await self._acquire()
+
+        try:
+            async with con.transaction():
+                yield con
+
+        finally:
+            await self.release()
+
     async def release(self):
 
         if self._db is not None:
             await self.bot.pool.release(self._db)
 
             self._db = None
+            self.bot.pool_stats.record_release(self.command_name, time.perf_counter() - self._acquired_at)
@@ -1,5 +1,9 @@
+import math
 import typing
 import asyncio
+import inspect
+
+from collections import OrderedDict
 
 from discord.ext.menus.views import menus
 from discord.ext.menus import First, Last, button
@@ -9,10 +13,146 @@ from config.utils.emojis import RIGHT_POINT, DRIGHT_POINT, LEFT_POINT, DLEFT_POI
 from main import Victorique
 
 
+async def from_list(entries):
+    """An async iterator over entries that are already in memory, for a LazyPageSource"""
+    for entry in entries:
+        yield entry
+
+
+async def keyset_rows(db, query, *args, key, batch=50):
+    """
+    Yields the rows of a keyset paginated query, a batch is only fetched once the previous one has been used
+    :param db: A pool or connection, a pool is better as pages are fetched long after the command returns
+    :param query: A query ordered by the key taking the key of the last row as $1, NULL for the first batch,
+                  and the batch size as $2, args are passed as $3 onwards
+    :param key: A callable returning the key of a row
+    """
+
+    last = None
+
+    while True:
+        rows = await db.fetch(query, last, batch, *args)
+
+        for row in rows:
+            yield row
+
+        if len(rows) < batch:
+            return
+
+        last = key(rows[-1])
+
+
+class LazyPageSource(menus.PageSource):
+    """
+    Pulls entries from an async iterator only as far as the pages being viewed, the formatted pages are kept
+    for a small window of recently viewed pages
+    """
+
+    def __init__(self, iterator, *, per_page, estimated_total=None, window=5, **attrs):
+        self.iterator = iterator.__aiter__()
+        self.per_page = per_page
+        self.estimated_total = estimated_total
+        self.window = window
+        self.entries = []
+        self.exhausted = False
+        self.formatted = OrderedDict()
+
+        # anything else the format function reads like a header, set per menu instead of on the class
+        for name, value in attrs.items():
+            setattr(self, name, value)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        format_page = cls.__dict__.get("format_page")
+
+        if format_page is not None:
+            cls.format_page = cls.cached_format(format_page)
+
+    @staticmethod
+    def cached_format(format_page):
+
+        async def wrapper(self, menu, page):
+            page_number = menu.current_page
+            formatted = self.formatted.get(page_number)
+
+            if formatted is None:
+                formatted = format_page(self, menu, page)
+
+                if inspect.isawaitable(formatted):
+                    formatted = await formatted
+
+                self.formatted[page_number] = formatted
+
+                if len(self.formatted) > self.window:
+                    self.formatted.popitem(last=False)
+
+            self.formatted.move_to_end(page_number)
+            return formatted
+
+        return wrapper
+
+    async def fill(self, amount):
+        while not self.exhausted and len(self.entries) < amount:
+            try:
+                self.entries.append(await self.iterator.__anext__())
+            except StopAsyncIteration:
+                self.exhausted = True
+                # formatted footers still show the estimate
+                self.formatted.clear()
+
+    async def exhaust(self):
+        await self.fill(math.inf)
+
+    async def prepare(self):
+        # one entry past the first page to know if there's a second
+        await self.fill(self.per_page + 1)
+
+    def is_paginating(self):
+        return len(self.entries) > self.per_page
+
+    def get_max_pages(self):
+        pages = math.ceil(len(self.entries) / self.per_page)
+
+        if not self.exhausted:
+            if self.estimated_total is None:
+                return None
+
+            pages = max(pages, math.ceil(self.estimated_total / self.per_page))
+
+        return max(pages, 1)
+
+    @property
+    def page_count(self):
+        """The page count for a footer, approximate until every entry has been pulled"""
+
+        pages = self.get_max_pages()
+
+        if pages is None:
+            return "?"
+
+        return str(pages) if self.exhausted else f"~{pages}"
+
+    async def get_page(self, page_number):
+        if page_number < 0:
+            raise IndexError("page out of range")
+
+        start = page_number * self.per_page
+        await self.fill(start + self.per_page + 1)
+
+        if start >= len(self.entries) and page_number != 0:
+            raise IndexError("page out of range")
+
+        if self.per_page == 1:
+            return self.entries[start]
+
+        return self.entries[start:start + self.per_page]
+
+
 def page_source(per_page=10, parent: typing.Union[menus.PageSource,
                                                   menus.ListPageSource,
                                                   menus.GroupByPageSource,
-                                                  menus.AsyncIteratorPageSource] = menus.ListPageSource):
+                                                  menus.AsyncIteratorPageSource,
+                                                  LazyPageSource] = menus.ListPageSource):
     """Compact Page sources"""
 
     def pages(f):
@@ -66,6 +206,10 @@ class BaseMenu(menus.views.ViewMenuPages):
             position=Last(1), skip_if=menus.MenuPages._skip_double_triangle_buttons)
     async def go_to_last_page(self, payload):
         """go to the last page"""
+        if isinstance(self._source, LazyPageSource):
+            # the page count is only an estimate until everything has been pulled
+            await self._source.exhaust()
+
         # The call here is safe because it's guarded by skip_if
         await self.show_page(self._source.get_max_pages() - 1)
 
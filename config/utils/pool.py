@@ -0,0 +1,80 @@
+import sys
+
+from collections import defaultdict
+
+import asyncpg
+
+import loadconfig
+
+# defaults for when loadconfig doesn't set them
+POOL_MIN_SIZE = getattr(loadconfig, "__pool_min_size__", 10)
+POOL_MAX_SIZE = getattr(loadconfig, "__pool_max_size__", 20)
+STATEMENT_CACHE_SIZE = getattr(loadconfig, "__statement_cache_size__", 512)
+# a connection held longer than this is reported
+SLOW_HOLD = getattr(loadconfig, "__pool_slow_hold__", 5.0)
+
+
+async def init_connection(con):
+    # runs once for every new connection in the pool
+    await con.execute("SET application_name = 'Victorique'")
+
+
+async def create_pool(dsn):
+    return await asyncpg.create_pool(dsn,
+                                     min_size=POOL_MIN_SIZE,
+                                     max_size=POOL_MAX_SIZE,
+                                     # prepared statements are cached per connection
+                                     statement_cache_size=STATEMENT_CACHE_SIZE,
+                                     max_cached_statement_lifetime=0,
+                                     max_inactive_connection_lifetime=300,
+                                     init=init_connection)
+
+
+class CommandPoolRecord:
+    __slots__ = ("acquires", "wait_time", "max_wait", "hold_time", "max_hold", "released_for_waits")
+
+    def __init__(self):
+        self.acquires = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.hold_time = 0.0
+        self.max_hold = 0.0
+        self.released_for_waits = 0
+
+    @property
+    def average_wait(self):
+        return self.wait_time / self.acquires if self.acquires else 0.0
+
+    @property
+    def average_hold(self):
+        return self.hold_time / self.acquires if self.acquires else 0.0
+
+
+class PoolStats:
+    """Acquire wait and hold times of pooled connections per command"""
+
+    def __init__(self):
+        self.commands = defaultdict(CommandPoolRecord)
+
+    def record_acquire(self, name, wait):
+        record = self.commands[name]
+        record.acquires += 1
+        record.wait_time += wait
+        record.max_wait = max(record.max_wait, wait)
+
+    def record_release(self, name, hold):
+        record = self.commands[name]
+        record.hold_time += hold
+        record.max_hold = max(record.max_hold, hold)
+
+        if hold >= SLOW_HOLD:
+            print(f"Connection held for {hold:.2f}s by {name}.", file=sys.stderr)
+
+    def record_wait_release(self, name):
+        self.commands[name].released_for_waits += 1
+
+    def top(self, key="hold_time", amount=10):
+        return sorted(self.commands.items(), key=lambda item: getattr(item[1], key), reverse=True)[:amount]
+
+    def clear(self):
+        self.commands.clear()
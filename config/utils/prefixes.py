@@ -0,0 +1,57 @@
+import re
+
+from collections import namedtuple, OrderedDict
+
+# the prefix a message was sent with and the content after it, prefix is None when it has none
+ParsedMessage = namedtuple("ParsedMessage", "prefix content")
+
+
+class GuildPrefix:
+    __slots__ = ("prefix", "allow_default", "prefixes", "matcher")
+
+    def __init__(self, prefix, allow_default, default_prefix):
+        self.prefix = prefix
+        self.allow_default = allow_default
+
+        prefixes = [prefix] if prefix else []
+
+        if allow_default:
+            prefixes.append(default_prefix)
+
+        prefixes.sort(reverse=True)
+        self.prefixes = tuple(prefixes)
+
+        # longest first so a prefix like !! isn't matched as !
+        alternatives = sorted(set(prefixes), key=len, reverse=True)
+        self.matcher = re.compile("|".join(map(re.escape, alternatives))) if alternatives else None
+
+    @classmethod
+    def from_record(cls, record, default_prefix):
+        if record is None:
+            return cls(None, True, default_prefix)
+
+        return cls(record["prefix"], record["allow_default"], default_prefix)
+
+    def match(self, content):
+        if self.matcher is None:
+            return None
+
+        match = self.matcher.match(content)
+        return match.group(0) if match else None
+
+
+class ParsedMessageCache:
+    """Keeps the parsed prefix of recent messages so every listener doesn't parse it again"""
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._messages = OrderedDict()
+
+    def get(self, message_id):
+        return self._messages.get(message_id)
+
+    def set(self, message_id, parsed):
+        self._messages[message_id] = parsed
+
+        if len(self._messages) > self.maxsize:
+            self._messages.popitem(last=False)
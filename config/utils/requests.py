@@ -1,6 +1,40 @@
 import functools
 import aiohttp
 import asyncio
+import random
+import time
+
+from collections import namedtuple, OrderedDict
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import loadconfig
+
+# seconds, for when loadconfig doesn't set them
+REQUEST_TIMEOUT = getattr(loadconfig, "__request_timeout__", 15)
+REQUEST_RETRIES = getattr(loadconfig, "__request_retries__", 3)
+
+# rate requests every per seconds with at most concurrency in flight, ttl is how long a GET is cached by default
+# and rate_headers follows the X-RateLimit headers the host sends
+DEFAULT_LIMIT = dict(rate=5, per=1, concurrency=4, ttl=None)
+
+HOST_LIMITS = {
+    # 90 a minute, lowered to 30 while the api is degraded which the headers tell us
+    "graphql.anilist.co": dict(rate=90, per=60, concurrency=4, rate_headers=True),
+    # the free tier only allows a single search at a time
+    "api.trace.moe": dict(rate=10, per=60, concurrency=1, rate_headers=True),
+    "azurlane.koumakan.jp": dict(rate=5, per=1, concurrency=2, ttl=300),
+    "some-random-api.ml": dict(rate=5, per=1, concurrency=2),
+    "danbooru.donmai.us": dict(rate=10, per=1, concurrency=4),
+    "konachan.com": dict(rate=2, per=1, concurrency=2),
+    "yande.re": dict(rate=2, per=1, concurrency=2),
+    "gelbooru.com": dict(rate=2, per=1, concurrency=2),
+    "safebooru.org": dict(rate=2, per=1, concurrency=2),
+    "lolibooru.moe": dict(rate=2, per=1, concurrency=2),
+}
+
+# the body of the response is already read, content is the decoded json or the raw bytes
+Response = namedtuple("Response", "status reason headers content")
 
 
 class RequestFailed(Exception):
@@ -23,39 +57,320 @@ def error_handle(f):
     return exception
 
 
+class HostLimit:
+    """Token bucket of rate requests every per seconds and a cap on requests in flight for a single host,
+    a queued request goes out as soon as a slot and a token are free"""
+
+    __slots__ = ("rate", "per", "concurrency", "ttl", "rate_headers", "tokens", "updated", "blocked_until",
+                 "semaphore", "lock", "waiting", "in_flight", "requests", "wait_time", "max_wait")
+
+    def __init__(self, rate, per, concurrency, ttl=None, rate_headers=False):
+        self.rate = rate
+        self.per = per
+        self.concurrency = concurrency
+        self.ttl = ttl
+        self.rate_headers = rate_headers
+        self.tokens = rate
+        self.updated = time.monotonic()
+        # set after a 429 so every request to the host waits out the Retry-After, not just the one that got it
+        self.blocked_until = 0.0
+        self.semaphore = asyncio.Semaphore(concurrency)
+        # waiters take tokens one at a time in the order they came in
+        self.lock = asyncio.Lock()
+        self.waiting = 0
+        self.in_flight = 0
+        self.requests = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def average_wait(self):
+        return self.wait_time / self.requests if self.requests else 0.0
+
+    @property
+    def blocked_for(self):
+        return max(self.blocked_until - time.monotonic(), 0.0)
+
+    def refill(self, now):
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.per)
+        self.updated = now
+
+    def block(self, seconds):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def update(self, headers):
+        """Follow the X-RateLimit headers of a response, only for hosts that send them"""
+
+        if not self.rate_headers:
+            return
+
+        try:
+            limit = int(headers["X-RateLimit-Limit"])
+            remaining = int(headers["X-RateLimit-Remaining"])
+        except (KeyError, ValueError):
+            return
+
+        self.refill(time.monotonic())
+        # a limit of 0 would leave the bucket unable to hold a token, the Reset header and block throttle instead
+        self.rate = max(limit, 1)
+        # the host counts requests from before a restart and other processes too
+        self.tokens = min(self.tokens, max(remaining, 0))
+
+        if remaining == 0:
+            try:
+                self.block(float(headers["X-RateLimit-Reset"]) - time.time())
+            except (KeyError, ValueError):
+                pass
+
+    async def take_token(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+
+                self.refill(now)
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                # sleeps until the next token is due rather than polling
+                await asyncio.sleep((1 - self.tokens) * self.per / self.rate)
+
+    async def acquire(self):
+        start = time.monotonic()
+        self.waiting += 1
+
+        try:
+            await self.semaphore.acquire()
+
+            try:
+                await self.take_token()
+            except BaseException:
+                self.semaphore.release()
+                raise
+
+        finally:
+            self.waiting -= 1
+
+        wait = time.monotonic() - start
+        self.requests += 1
+        self.wait_time += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self.semaphore.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *args):
+        self.release()
+
+
+class _CachedResponse:
+    __slots__ = ("response", "expires", "etag", "last_modified")
+
+    def __init__(self, response, ttl):
+        self.response = response
+        self.expires = time.monotonic() + ttl
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+
+    @property
+    def expired(self):
+        return time.monotonic() >= self.expires
+
+    def validators(self):
+        headers = {}
+
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+
+        return headers
+
+
+class ResponseCache:
+    """GET responses keyed on the url and params, expired entries with an ETag are revalidated instead of refetched"""
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._responses = OrderedDict()
+
+    @staticmethod
+    def key(url, params):
+        if not params:
+            return url, ()
+
+        items = params.items() if isinstance(params, dict) else params
+        return url, tuple(sorted((str(k), str(v)) for k, v in items))
+
+    def get(self, key):
+        entry = self._responses.get(key)
+
+        if entry is not None:
+            self._responses.move_to_end(key)
+
+        return entry
+
+    def set(self, key, response, ttl):
+        self._responses[key] = _CachedResponse(response, ttl)
+        self._responses.move_to_end(key)
+
+        if len(self._responses) > self.maxsize:
+            self._responses.popitem(last=False)
+
+    def clear(self):
+        self._responses.clear()
+
+    def __len__(self):
+        return len(self._responses)
+
+
 class Request:
-    def __init__(self, bot, session):
-        __slots__ = ("loop", "session")
-        self.loop = bot.loop
+    """Shared http client, every request goes through the host's limits and 429s and 5xxs are retried"""
+
+    def __init__(self, bot, session, timeout=REQUEST_TIMEOUT, retries=REQUEST_RETRIES, backoff=1.0):
+        self.bot = bot
         self.session = session
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.limits = {}
+        self.cache = ResponseCache()
+
+    def host_limit(self, url):
+        host = urlsplit(url).hostname or ""
+        limit = self.limits.get(host)
+
+        if limit is None:
+            limit = self.limits[host] = HostLimit(**HOST_LIMITS.get(host, DEFAULT_LIMIT))
+
+        return limit
 
     @staticmethod
-    async def return_content(response, headers):
-        if not response.status == 200:
-            raise RequestFailed(f"seems like an error occurred for this request this api might be experiencing "
-                                f"problems `{response.reason}`.")
+    def retry_after(headers):
+        value = headers.get("Retry-After")
+
+        if value is None:
+            return None
+
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+    def retry_delay(self, response, attempt):
+        delay = self.retry_after(response.headers)
+
+        if delay is not None:
+            # a little jitter so everything waiting on the same Retry-After doesn't go at once
+            return delay + random.uniform(0, 1)
+
+        # full jitter exponential backoff
+        return random.uniform(0, min(self.backoff * 2 ** attempt, 30))
+
+    @staticmethod
+    async def read_content(response):
+        headers = response.headers.get("content-type") or ""
 
         if headers in ("application/json", "application/javascript", "application/javascript",
                        "application/json; charset=utf-8") or "json" in headers:
-            return await response.json()
+            try:
+                return await response.json(content_type=None)
+            except ValueError:
+                # error pages sent with a json content type
+                pass
 
         return await response.read()
 
     @error_handle
-    async def fetch(self, url, **kwargs):
-        async with self.session.get(url, **kwargs) as response:
+    async def request(self, method, url, *, ttl=None, **kwargs):
+        """Returns a Response for any status, the caller decides what counts as failed
+        ttl caches a GET for that many seconds, defaults to the host's ttl"""
 
-            if not response.status == 200:
-                raise RequestFailed(f"seems like an unexpected error occurred for this request `{response.reason}`.")
+        limit = self.host_limit(url)
+        kwargs.setdefault("timeout", self.timeout)
 
-            headers = response.headers.get("content-type")
-            return await self.return_content(response, headers)
+        if ttl is None:
+            ttl = limit.ttl
 
-    @error_handle
-    async def post(self, url, data, **kwargs):
+        key = entry = None
+
+        if method == "GET" and ttl:
+            key = self.cache.key(url, kwargs.get("params"))
+            entry = self.cache.get(key)
+
+            if entry is not None and not entry.expired:
+                self.cache.hits += 1
+                return entry.response
+
+            self.cache.misses += 1
+
+            if entry is not None:
+                kwargs["headers"] = {**entry.validators(), **kwargs.get("headers", {})}
+
+        attempt = 0
+
+        while True:
+            async with limit:
+                async with self.session.request(method, url, **kwargs) as response:
+                    limit.update(response.headers)
+
+                    if response.status == 304 and entry is not None:
+                        self.cache.revalidated += 1
+                        self.cache.set(key, entry.response, ttl)
+                        return entry.response
+
+                    retry = response.status == 429 or response.status >= 500
+
+                    if not retry or attempt >= self.retries:
+                        result = Response(response.status, response.reason, response.headers,
+                                          await self.read_content(response))
+
+                        if key is not None and response.status == 200:
+                            self.cache.set(key, result, ttl)
 
-        async with self.session.post(url, data=data, **kwargs) as response:
+                        return result
 
-            headers = response.headers.get("content-type")
-            return await self.return_content(response, headers)
+                    delay = self.retry_delay(response, attempt)
+
+                    if response.status == 429:
+                        limit.block(delay)
+
+            # waited out without holding the host's concurrency slot
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def fetch(self, url, *, ttl=None, **kwargs):
+        response = await self.request("GET", url, ttl=ttl, **kwargs)
+
+        if not response.status == 200:
+            raise RequestFailed(f"seems like an unexpected error occurred for this request `{response.reason}`.")
+
+        return response.content
+
+    async def post(self, url, data=None, **kwargs):
+        response = await self.request("POST", url, data=data, **kwargs)
+
+        if not response.status == 200:
+            raise RequestFailed(f"seems like an error occurred for this request this api might be experiencing "
+                                f"problems `{response.reason}`.")
 
+        return response.content
@@ -0,0 +1,168 @@
+from collections import Counter
+from itertools import islice
+
+
+def trigrams(word):
+    # padded the same way pg_trgm pads a word
+    word = f"  {word} "
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def did_you_mean(suggestions):
+    """The end of a not found message offering the suggestions, empty when there are none"""
+
+    if not suggestions:
+        return ""
+
+    return " did you mean " + ", ".join(f"`{s}`" for s in suggestions) + "?"
+
+
+class TagIndex:
+    """Tag names for a single guild, names are keyed on their lower case form"""
+
+    __slots__ = ("names", "trie", "trigrams", "name_trigrams")
+
+    def __init__(self):
+        # lower case name -> name as it was stored
+        self.names = {}
+        self.trie = {}
+        self.trigrams = {}
+        self.name_trigrams = {}
+
+    def __contains__(self, name):
+        return name.lower() in self.names
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name):
+        key = name.lower()
+
+        if key in self.names:
+            self.names[key] = name
+            return
+
+        self.names[key] = name
+
+        node = self.trie
+        for c in key:
+            node = node.setdefault(c, {})
+        # None marks the end of a name
+        node[None] = key
+
+        grams = trigrams(key)
+        self.name_trigrams[key] = grams
+        for gram in grams:
+            self.trigrams.setdefault(gram, set()).add(key)
+
+    def remove(self, name):
+        key = name.lower()
+
+        if self.names.pop(key, None) is None:
+            return False
+
+        path = []
+        node = self.trie
+        for c in key:
+            path.append((node, c))
+            node = node[c]
+
+        del node[None]
+        # prune nodes that no longer lead to a name
+        for parent, c in reversed(path):
+            if parent[c]:
+                break
+            del parent[c]
+
+        for gram in self.name_trigrams.pop(key):
+            names = self.trigrams[gram]
+            names.discard(key)
+            if not names:
+                del self.trigrams[gram]
+
+        return True
+
+    def iter_startswith(self, prefix):
+        """Names starting with prefix in order, the trie is only walked as far as the names that are used"""
+
+        node = self.trie
+        for c in prefix.lower():
+            node = node.get(c)
+            if node is None:
+                return
+
+        stack = [node]
+        while stack:
+            node = stack.pop()
+
+            if None in node:
+                yield self.names[node[None]]
+
+            # pushed in reverse so the smallest character comes off the stack first
+            stack.extend(node[c] for c in sorted((c for c in node if c is not None), reverse=True))
+
+    def startswith(self, prefix, limit=None):
+        return list(islice(self.iter_startswith(prefix), limit))
+
+    def similar(self, name, limit=3, threshold=0.3):
+        grams = trigrams(name.lower())
+        shared = Counter()
+
+        for gram in grams:
+            shared.update(self.trigrams.get(gram, ()))
+
+        scored = []
+        for key, count in shared.items():
+            similarity = count / (len(grams) + len(self.name_trigrams[key]) - count)
+            if similarity >= threshold:
+                scored.append((similarity, key))
+
+        scored.sort(key=lambda t: (-t[0], t[1]))
+        return [self.names[key] for _, key in scored[:limit]]
+
+
+class TagIndexes:
+    """Per guild tag name indexes so messages that aren't tags never reach the database"""
+
+    def __init__(self):
+        self.guilds = {}
+
+    def get(self, guild_id):
+        index = self.guilds.get(guild_id)
+
+        if index is None:
+            index = self.guilds[guild_id] = TagIndex()
+
+        return index
+
+    def load(self, records):
+        self.guilds = {}
+        for record in records:
+            self.get(record["guild_id"]).add(record["tag_name"])
+
+    def contains(self, guild_id, name):
+        index = self.guilds.get(guild_id)
+        return index is not None and name in index
+
+    def add(self, guild_id, name):
+        self.get(guild_id).add(name)
+
+    def remove(self, guild_id, name):
+        index = self.guilds.get(guild_id)
+        return index is not None and index.remove(name)
+
+    def search(self, guild_id, prefix, limit=None):
+        index = self.guilds.get(guild_id)
+        return index.startswith(prefix, limit) if index else []
+
+    def iter_search(self, guild_id, prefix):
+        index = self.guilds.get(guild_id)
+        return index.iter_startswith(prefix) if index else iter(())
+
+    def count(self, guild_id):
+        index = self.guilds.get(guild_id)
+        return len(index) if index else 0
+
+    def suggestions(self, guild_id, name, limit=3):
+        index = self.guilds.get(guild_id)
+        return index.similar(name, limit) if index else []
@@ -0,0 +1,85 @@
+import asyncio
+
+from collections import Counter
+
+import asyncpg
+from discord.ext import tasks
+
+
+class TagUsage:
+    """Accumulates tag uses in memory and writes them in batches instead of on every use"""
+
+    query = """
+            WITH tag_uses AS (
+                UPDATE tags t SET uses = t.uses + d.uses
+                FROM unnest($1::bigint[], $2::text[], $3::int[]) AS d (guild_id, tag_name, uses)
+                WHERE t.guild_id = d.guild_id AND t.tag_name = d.tag_name
+            )
+            UPDATE user_tag_usage u SET uses = u.uses + d.uses
+            FROM unnest($4::bigint[], $5::bigint[], $6::int[]) AS d (guild_id, user_id, uses)
+            WHERE u.guild_id = d.guild_id AND u.user_id = d.user_id
+            """
+
+    def __init__(self, pool, interval=30):
+        self.pool = pool
+        # (guild_id, tag_name) -> uses
+        self.tag_uses = Counter()
+        # (guild_id, user_id) -> uses
+        self.user_uses = Counter()
+        # held while a batch is swapped out and written so close can't cancel a flush half way
+        self.lock = asyncio.Lock()
+        self.flush_loop.change_interval(seconds=interval)
+        # keep the loop running if the database is briefly unavailable, the uses are retried next flush
+        self.flush_loop.add_exception_type(asyncpg.PostgresError, asyncpg.InterfaceError)
+
+    def add(self, guild_id, tag_name, user_id):
+        self.tag_uses[(guild_id, tag_name)] += 1
+        self.user_uses[(guild_id, user_id)] += 1
+
+    def pending_tag(self, guild_id, tag_name):
+        return self.tag_uses.get((guild_id, tag_name), 0)
+
+    def pending_user(self, guild_id, user_id):
+        return self.user_uses.get((guild_id, user_id), 0)
+
+    def pending_guild(self, guild_id):
+        return sum(uses for (g_id, _), uses in self.tag_uses.items() if g_id == guild_id)
+
+    async def flush(self):
+        async with self.lock:
+            if not self.tag_uses and not self.user_uses:
+                return
+
+            # swap the counters out first so uses made during the write go in the next batch
+            tag_uses, self.tag_uses = self.tag_uses, Counter()
+            user_uses, self.user_uses = self.user_uses, Counter()
+
+            tag_keys = list(tag_uses)
+            user_keys = list(user_uses)
+
+            try:
+                await self.pool.execute(self.query,
+                                        [k[0] for k in tag_keys], [k[1] for k in tag_keys],
+                                        [tag_uses[k] for k in tag_keys],
+                                        [k[0] for k in user_keys], [k[1] for k in user_keys],
+                                        [user_uses[k] for k in user_keys])
+
+            except Exception:
+                # put them back so they're retried with the next flush
+                self.tag_uses.update(tag_uses)
+                self.user_uses.update(user_uses)
+                raise
+
+    @tasks.loop(seconds=30)
+    async def flush_loop(self):
+        await self.flush()
+
+    def start(self):
+        self.flush_loop.start()
+
+    async def close(self):
+        # a flush the loop is already writing is waited on, the loop is only cancelled between batches
+        async with self.lock:
+            self.flush_loop.cancel()
+
+        await self.flush()
@@ -125,41 +125,44 @@ class Triva(discord.ui.View):
 
     async def build_questions(self, ctx, category, difficulty, amount):
 
-        async with self.ctx.acquire():
-
-            if amount > 10:
-                amount = 10
-
-            query = """SELECT content, type, difficulty, question_id, c.name as category FROM question q 
-                          INNER JOIN category c on c.category_id = q.category_id
-                          WHERE ($1::smallint is NULL or q.category_id = $1::smallint) AND
-                          ($2::text is NULL or difficulty = $2::text)"""
-
-            results = await ctx.db.fetch(query, category, difficulty)
-
-            results = random.sample(results, amount)
-
-            for record in results:
-                question = namedtuple("question", "content category answers type difficulty")
-
-                answers = []
-                records = await ctx.db.fetch("SELECT content, is_correct FROM answer WHERE question_id = $1",
-                                             record["question_id"])
-
-                random.shuffle(records)
-
-                for i, r in enumerate(records):
-                    answer = namedtuple("answer", "record emoji")
-                    answer.record = r
-                    answer.emoji = self.emojis[i]
-                    answers.append(answer)
-
-                question.type = record["type"]
-                question.content = record["content"]
-                question.category = record["category"]
-                question.difficulty = record["difficulty"]
-                question.answers = answers.copy()
-                self.questions.append(question)
+        if amount > 10:
+            amount = 10
+
+        # questions and their answers in one round trip through the pool, the view then waits on
+        # the user for minutes so a connection shouldn't be acquired for it
+        query = """SELECT q.content, q.type, q.difficulty, c.name as category,
+                          array_agg(a.content) as answers, array_agg(a.is_correct) as correct
+                   FROM (SELECT * FROM question
+                         WHERE ($1::smallint is NULL or category_id = $1::smallint) AND
+                         ($2::text is NULL or difficulty = $2::text)
+                         ORDER BY random() LIMIT $3) q
+                   INNER JOIN category c on c.category_id = q.category_id
+                   INNER JOIN answer a on a.question_id = q.question_id
+                   GROUP BY q.question_id, q.content, q.type, q.difficulty, c.name"""
+
+        results = await ctx.pool.fetch(query, category, difficulty, amount)
+
+        for record in results:
+            question = namedtuple("question", "content category answers type difficulty")
+
+            answers = []
+            records = [{"content": content, "is_correct": is_correct}
+                       for content, is_correct in zip(record["answers"], record["correct"])]
+
+            random.shuffle(records)
+
+            for i, r in enumerate(records):
+                answer = namedtuple("answer", "record emoji")
+                answer.record = r
+                answer.emoji = self.emojis[i]
+                answers.append(answer)
+
+            question.type = record["type"]
+            question.content = record["content"]
+            question.category = record["category"]
+            question.difficulty = record["difficulty"]
+            question.answers = answers.copy()
+            self.questions.append(question)
 
     async def next_question(self):
         await asyncio.sleep(self.pause)
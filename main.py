@@ -13,20 +13,34 @@ import discord
 import loadconfig
 from config.utils import cache, requests, checks
 from config.utils import context
+from config.utils.pool import PoolStats, create_pool
+from config.utils.prefixes import GuildPrefix, ParsedMessage, ParsedMessageCache
+from config.utils.tag_index import TagIndexes
+from config.utils.tag_usage import TagUsage
 
 
 class Victorique(commands.Bot):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.channels_running_commands = {}
+        # guild id -> GuildPrefix, loaded on startup and kept current by set_prefix
+        self.prefix_table = {}
+        self.parsed_messages = ParsedMessageCache()
+        self.tag_index = TagIndexes()
+        self.pool_stats = PoolStats()
 
     async def __ainit__(self, *args, **kwargs):
         self.request = requests.Request(self, self.session)
-        db = await asyncpg.create_pool(loadconfig.credentials)
-        self.pool = db
+        self.pool = await create_pool(loadconfig.credentials)
         with open("schema.sql") as f:
             await self.pool.execute(f.read())
 
+        await self.load_prefix_table()
+        await self.load_tag_index()
+
+        self.tag_usage = TagUsage(self.pool)
+        self.tag_usage.start()
+
     async def setup_hook(self):
         await self.loop.create_task(self.__ainit__())
 
@@ -47,9 +61,21 @@ class Victorique(commands.Bot):
         return user.id in loadconfig.__owner_ids__
 
     async def close(self):
-        await self.session.close()
-        await self.pool.close()
-        await super().close()
+        try:
+            # write any tag uses that haven't been flushed yet, __ainit__ may not have got as far as them
+            if hasattr(self, "tag_usage"):
+                await self.tag_usage.close()
+
+        finally:
+            # the rest of the shutdown runs even if the database is unreachable
+            try:
+                await self.session.close()
+
+                if hasattr(self, "pool"):
+                    await self.pool.close()
+
+            finally:
+                await super().close()
 
     async def fetch(self, url, **kwargs):
         return await self.request.fetch(url, **kwargs)
@@ -60,7 +86,7 @@ class Victorique(commands.Bot):
     async def get_context(self, message, *, cls=None):
         return await super().get_context(message, cls=context.Context)
 
-    @cache.cache()
+    @cache.cache(ttl=600)
     async def get_guild_prefix(self, guild_id):
 
         async with self.pool.acquire() as con:
@@ -72,6 +98,54 @@ class Victorique(commands.Bot):
 
             return data
 
+    async def load_prefix_table(self):
+        rows = await self.pool.fetch("SELECT guild_id, prefix, allow_default FROM guilds")
+        self.prefix_table = {row["guild_id"]: GuildPrefix.from_record(row, loadconfig.__prefix__) for row in rows}
+
+    async def get_guild_prefixes(self, guild_id):
+        guild_prefix = self.prefix_table.get(guild_id)
+
+        if guild_prefix is None:
+            # a guild joined after startup or was invalidated
+            data = await self.get_guild_prefix(guild_id)
+            guild_prefix = GuildPrefix.from_record(data, loadconfig.__prefix__)
+            self.prefix_table[guild_id] = guild_prefix
+
+        return guild_prefix
+
+    def set_guild_prefix(self, guild_id, prefix, allow_default):
+        self.prefix_table[guild_id] = GuildPrefix(prefix, allow_default, loadconfig.__prefix__)
+        self.get_guild_prefix.invalidate(self, guild_id)
+
+    def prefix_invalidate(self, guild_id):
+        self.prefix_table.pop(guild_id, None)
+        return self.get_guild_prefix.invalidate(self, guild_id)
+
+    async def parse_message(self, message):
+        """Parse the prefix of a message once, listeners share the result instead of building a context"""
+        parsed = self.parsed_messages.get(message.id)
+
+        if parsed is not None:
+            return parsed
+
+        content = message.content
+        prefix = None
+
+        if self.user and content.startswith((f"<@{self.user.id}> ", f"<@!{self.user.id}> ")):
+            prefix = content.split(" ", 1)[0] + " "
+
+        elif message.guild is None:
+            if content.startswith(loadconfig.__prefix__):
+                prefix = loadconfig.__prefix__
+
+        else:
+            guild_prefix = await self.get_guild_prefixes(message.guild.id)
+            prefix = guild_prefix.match(content)
+
+        parsed = ParsedMessage(prefix, content[len(prefix):] if prefix else content)
+        self.parsed_messages.set(message.id, parsed)
+        return parsed
+
     async def api_get_image(self, content, url, key):
 
         js = await self.fetch(url)
@@ -87,8 +161,7 @@ class Victorique(commands.Bot):
         embed.set_image(url=js[key])
         return embed
 
-    prefix_invalidate = get_guild_prefix.invalidate
-    prefixes = get_guild_prefix.get_stats
+    prefixes = staticmethod(get_guild_prefix.get_stats)
 
     @staticmethod
     def emote_unescape(msg):
@@ -101,42 +174,43 @@ class Victorique(commands.Bot):
 
         return msg
 
-    @cache.cache()
+    @cache.cache(maxsize=2048, ttl=300)
     async def get_tag(self, guild_id, tag_name):
 
-        guild_id = guild_id
-        tag_name = tag_name
-
-        async with bot.pool.acquire() as con:
+        async with self.pool.acquire() as con:
             tag = await con.fetchrow("""select guild_id, content, nsfw, tag_name from tags where guild_id =  $1 
-                                     and lower(tag_name) LIKE $2""",
+                                     and lower(tag_name) = $2""",
                                      guild_id, tag_name)
 
             return tag
 
-    tags_invalidate = get_tag.invalidate
-    tags = get_tag.get_stats
+    tags = staticmethod(get_tag.get_stats)
 
+    async def load_tag_index(self):
+        self.tag_index.load(await self.pool.fetch("SELECT guild_id, tag_name FROM tags"))
 
-async def get_prefix(bot_, msg):
-    if msg.guild is None:
-        return commands.when_mentioned_or(*[loadconfig.__prefix__, ""])(bot_, msg)
+    async def refresh_tag(self, guild_id, tag_name):
+        name = await self.pool.fetchval("SELECT tag_name FROM tags WHERE guild_id = $1 and lower(tag_name) = $2",
+                                        guild_id, tag_name.lower())
+        if name is None:
+            self.tag_index.remove(guild_id, tag_name)
+        else:
+            self.tag_index.add(guild_id, name)
 
-    data = await bot_.get_guild_prefix(msg.guild.id)
+    def tags_invalidate(self, guild_id, tag_name, refresh_index=True):
+        self.get_tag.invalidate(self, guild_id, tag_name.lower())
 
-    if data is None:
-        return commands.when_mentioned_or(loadconfig.__prefix__)(bot_, msg)
+        if refresh_index:
+            # the tag may have been created, renamed or deleted so check it again
+            self.loop.create_task(self.refresh_tag(guild_id, tag_name))
 
-    prefix = [data["prefix"]]
 
-    if not prefix[0]:
-        prefix = []
-
-    if data["allow_default"]:
-        prefix.append(loadconfig.__prefix__)
+async def get_prefix(bot_, msg):
+    if msg.guild is None:
+        return commands.when_mentioned_or(*[loadconfig.__prefix__, ""])(bot_, msg)
 
-    prefix.sort(reverse=True)
-    return commands.when_mentioned_or(*prefix)(bot_, msg)
+    guild_prefix = await bot_.get_guild_prefixes(msg.guild.id)
+    return commands.when_mentioned_or(*guild_prefix.prefixes)(bot_, msg)
 
 # As of 2020-10-28, discord requires users declare what sort of information their bot requires which is done in the form
 # of intents
@@ -175,9 +249,9 @@ async def send_emote(ctx, name: str):
 @bot.command(hidden=True)
 async def prefix(ctx):
     if ctx.guild:
-        result = await bot.get_guild_prefix(ctx.guild.id)
-        if result["prefix"] is not None:
-            return await ctx.send(f"The prefix for this guild is {result['prefix']}.")
+        result = await bot.get_guild_prefixes(ctx.guild.id)
+        if result.prefix is not None:
+            return await ctx.send(f"The prefix for this guild is {result.prefix}.")
 
     await ctx.send(f"The prefix for this guild is {loadconfig.__prefix__}")
 
@@ -197,14 +271,6 @@ async def presence_change():
 async def before_presence_change():
     await bot.wait_until_ready()
 
-@bot.event
-async def on_user_update(before, after):
-    new_name = after.input
-    user_id = after.id
-    async with bot.pool.acquire() as con:
-        await con.execute("UPDATE users SET name = $1 where user_id = $2", new_name, user_id)
-
-
 @bot.event
 async def on_disconnect():
     presence_change.cancel()
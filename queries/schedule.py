@@ -5,8 +5,10 @@ def search_schedule():
           Page(page: $page, perPage: 50) {
             pageInfo {
               hasNextPage
+              lastPage
             }
             media(status: RELEASING, type: ANIME, format: TV) {
+              id
               nextAiringEpisode {
                 airingAt
               }
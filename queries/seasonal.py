@@ -1,8 +1,8 @@
 
 def search_seasonal():
     query = """
-        query ($year: Int, $season: MediaSeason, $type: MediaType, $format: MediaFormat) {
-          Page(page: 1, perPage: 50) {
+        query ($year: Int, $season: MediaSeason, $type: MediaType, $format: MediaFormat, $page: Int = 1) {
+          Page(page: $page, perPage: 50) {
             pageInfo {
               hasNextPage
             }
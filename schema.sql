@@ -7,6 +7,9 @@ CREATE TABLE IF NOT EXISTS guilds (
     nsfw_channel bigint
 );
 
+-- members that joined before this are in the user tables, null if the guild has never been synced
+ALTER TABLE guilds ADD COLUMN IF NOT EXISTS synced_at timestamp;
+
 CREATE TABLE IF NOT EXISTS users (
     user_id bigint PRIMARY KEY,
     name text NOT NULL,
@@ -59,6 +62,8 @@ CREATE EXTENSION IF NOT EXISTS tsm_system_rows;
 CREATE INDEX IF NOT EXISTS tags_name_trgm_idx ON tags USING GIN (tag_name gin_trgm_ops);
 CREATE INDEX IF NOT EXISTS tags_name_lower_idx ON tags (LOWER(tag_name));
 CREATE UNIQUE INDEX IF NOT EXISTS tags_uniq_idx ON tags (tag_name, guild_id);
+-- keyset pagination of a guild's tags
+CREATE INDEX IF NOT EXISTS tags_guild_name_idx ON tags (guild_id, LOWER(tag_name));
 
 CREATE TABLE IF NOT EXISTS fish_bait (
     bait_id smallint PRIMARY KEY,
@@ -132,6 +137,7 @@ CREATE TABLE IF NOT EXISTS fish_users_catches (
     fish_id smallint REFERENCES fish (fish_id),
     fish_name text REFERENCES fish (fish_name),
     amount int,
+    -- also the keyset a collection is paginated on
     PRIMARY KEY (user_id, fish_id)
 );
 